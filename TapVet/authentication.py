@@ -1,17 +1,134 @@
+"""
+Token authentication with a cache of the token lookups.
+
+The tokens are looked up in each tier of TOKEN_CACHE_TIERS before going to
+the database: an in-process LRU, then Redis when it is configured. The
+cached tokens are pickled with their user and group, so every request
+gets its own instances. The entries are dropped when the token is deleted
+or its user saved (deactivations included), see users.signals; the other
+processes drop their local entry after TOKEN_CACHE_TTL seconds.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
 from rest_framework.authentication import TokenAuthentication as TokenAuth
 
 from rest_framework import exceptions
 
+from . import queue
+
+
+class LocalTokenTier(object):
+    """LRU of the tokens used lately by this process."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            expires, value = self.entries.pop(key, (0, None))
+            if expires <= time.time():
+                return None
+            self.entries[key] = (expires, value)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.time() + settings.TOKEN_CACHE_TTL, value)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class RedisTokenTier(object):
+    """Tokens shared by every process, only used when Redis is set."""
+
+    @property
+    def enabled(self):
+        return queue.get_redis() is not None
+
+    @staticmethod
+    def redis_key(key):
+        return 'tapvet:token:%s' % key
+
+    def get(self, key):
+        client = queue.get_redis()
+        if client is not None:
+            return client.get(self.redis_key(key))
+
+    def set(self, key, value):
+        client = queue.get_redis()
+        if client is not None:
+            client.setex(
+                self.redis_key(key), settings.TOKEN_CACHE_REDIS_TTL, value
+            )
+
+    def delete(self, key):
+        client = queue.get_redis()
+        if client is not None:
+            client.delete(self.redis_key(key))
+
+
+class TokenCache(object):
+
+    def __init__(self, tiers):
+        self.tiers = OrderedDict(
+            (path.rsplit('.', 1)[-1], import_string(path)())
+            for path in tiers
+        )
+        self.stats = dict(
+            (name, {'hits': 0, 'misses': 0}) for name in self.tiers
+        )
+
+    def get(self, key):
+        missed = []
+        for name, tier in self.tiers.items():
+            if not getattr(tier, 'enabled', True):
+                continue
+            value = tier.get(key)
+            if value is not None:
+                self.stats[name]['hits'] += 1
+                for other in missed:
+                    other.set(key, value)
+                return pickle.loads(value)
+            self.stats[name]['misses'] += 1
+            missed.append(tier)
+        return None
+
+    def set(self, key, token):
+        value = pickle.dumps(token, pickle.HIGHEST_PROTOCOL)
+        for tier in self.tiers.values():
+            tier.set(key, value)
+
+    def delete(self, key):
+        for tier in self.tiers.values():
+            tier.delete(key)
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_TIERS)
+
 
 class TokenAuthentication(TokenAuth):
     def authenticate_credentials(self, key):
-        model = self.get_model()
-        try:
-            token = model.objects.select_related(
-                'user__groups'
-            ).get(key=key)
-        except model.DoesNotExist:
-            raise exceptions.AuthenticationFailed('Invalid token.')
+        token = token_cache.get(key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related(
+                    'user__groups'
+                ).get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            token_cache.set(key, token)
 
         if not token.user.is_active:
             raise exceptions.AuthenticationFailed('User inactive or deleted.')
@@ -1,10 +1,185 @@
+import hashlib
+import logging
+import mmap
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
 from PIL import Image as Img
-from StringIO import StringIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from rest_framework.serializers import ImageField, ValidationError
+
+from . import messages, queue
+
+logger = logging.getLogger(__name__)
 
 STANDARD_SIZE = (612, 612)
 THUMBNAIL_SIZE = (150, 150)
 
+# Image field filled by each rendition, the size it fits in and the
+# rendition it is shrunk from (None for the original). Sources come first.
+Rendition = namedtuple('Rendition', ('field', 'size', 'source'))
+
+RENDITIONS = (
+    Rendition('standard', STANDARD_SIZE, None),
+    Rendition('thumbnail', THUMBNAIL_SIZE, 'standard'),
+)
+
+IMAGES_QUEUE = 'images'
+
+# Files named after the SHA-256 of their content, stored once
+CAS_ROOT = 'uploads/cas'
+
+# Image fields that can point to content addressed files
+IMAGE_FIELDS = (
+    ('posts.ImagePost', ('original', 'standard', 'thumbnail')),
+    ('users.ProfileImage', ('original', 'standard', 'thumbnail')),
+    ('pets.Pet', ('image',)),
+)
+
+# State of the renditions of an uploaded image
+PROCESSING = 'processing'
+READY = 'ready'
+FAILED = 'failed'
+
+STATE_CHOICES = (
+    (PROCESSING, 'Processing'),
+    (READY, 'Ready'),
+    (FAILED, 'Failed')
+)
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(64 * 1024), b''):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_path(digest, suffix):
+    return '/'.join([CAS_ROOT, digest[:2], digest + suffix])
+
+
+@deconstructible
+class ContentAddressedPath(object):
+    """
+    upload_to of the image fields stored by content: the file uploaded to
+    `field` goes to the blob named after its hash, so identical uploads
+    share one file.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __call__(self, instance, filename):
+        content = getattr(instance, self.field).file
+        extension = os.path.splitext(filename)[1].lower() or '.jpg'
+        return blob_path(content_hash(content), extension)
+
+    def __eq__(self, other):
+        return isinstance(other, ContentAddressedPath) and \
+            self.field == other.field
+
+
+class BlobExists(Exception):
+    pass
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps the name of the content addressed
+    files: saving a blob that already exists only returns its name.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        if name.startswith(CAS_ROOT + '/'):
+            if self.exists(name):
+                raise BlobExists(name)
+            return name
+        return super(ContentAddressedStorage, self).get_available_name(
+            name, max_length
+        )
+
+    def save(self, name, content, max_length=None):
+        try:
+            return super(ContentAddressedStorage, self).save(
+                name, content, max_length
+            )
+        except BlobExists as exists:
+            # Also raised when another upload wrote the same blob meanwhile.
+            # Touched so the garbage collector leaves the reused blob alone
+            name = exists.args[0]
+            os.utime(self.path(name), None)
+            return name
+
+
+def check_pixels(img):
+    width, height = img.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValueError(messages.image_too_many_pixels)
+
+
+def check_upload(image_file):
+    """
+    Reject the uploads over the byte or pixel limits, reading the image
+    header only.
+    """
+    if image_file.size > settings.IMAGE_MAX_BYTES:
+        raise ValidationError(messages.image_too_large)
+    try:
+        check_pixels(Img.open(image_file))
+    except IOError:
+        raise ValidationError(messages.image_invalid)
+    except ValueError as err:
+        raise ValidationError(str(err))
+    finally:
+        image_file.seek(0)
+
+
+class UploadImageField(ImageField):
+    """
+    ImageField checking the limits of the upload before the full image is
+    verified.
+    """
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'size') and hasattr(data, 'seek'):
+            check_upload(data)
+        return super(UploadImageField, self).to_internal_value(data)
+
+
+@contextmanager
+def mapped(field_file):
+    """
+    Stored image as a memory map, so the decoder reads the file pages
+    without a copy of the whole file in the process memory. Storages
+    without local paths are read through the file object.
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        field_file.open('rb')
+        try:
+            yield field_file
+        finally:
+            field_file.close()
+        return
+    with open(path, 'rb') as image_file:
+        data = mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield data
+        finally:
+            data.close()
+
 
 class ImageSerializerMixer(object):
     quality = 70
@@ -35,19 +210,21 @@ class ImageSerializerMixer(object):
         output.seek(0)
         return output
 
-    def image_resize(self, size, img, image_stream):
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
+    def image_resize(self, size, img, name):
+        """
+        Shrink `img` in place to fit in `size` and encode it as an upload
+        named after `name`.
+        """
         img.thumbnail(size, Img.ANTIALIAS)
         '''
         Two choices:
 
-        output = self.image_no_background(img, size, StringIO())
+        output = self.image_no_background(img, size, BytesIO())
 
         Will return an image with no white background, this means that the
         image will no be a square image.
 
-        output = self.image_with_background(img, size, StringIO())
+        output = self.image_with_background(img, size, BytesIO())
 
         Will return  an image with a white background, making this a square
         image.
@@ -56,10 +233,179 @@ class ImageSerializerMixer(object):
         the feed frontend and choose one or the other.
 
         '''
-        output = self.image_no_background(img, size, StringIO())
+        output = self.image_no_background(img, size, BytesIO())
         image = InMemoryUploadedFile(
             output, 'ImageField',
-            self.image_format[0][1] % image_stream.name.split('.')[0],
-            self.image_format[0][2], output.len, None
+            self.image_format[0][1] % name.split('.')[0],
+            self.image_format[0][2], len(output.getvalue()), None
         )
         return image
+
+    def image_renditions(self, image_file, name, renditions=RENDITIONS):
+        """
+        Decode `image_file` once and make every rendition of `renditions`
+        from it, returns them by field name.
+
+        JPEG files are decoded straight at the smallest scale still larger
+        than the biggest rendition, and the renditions with a `source` are
+        shrunk from that rendition instead of the full image.
+        """
+        img = Img.open(image_file)
+        check_pixels(img)
+        if img.format == 'JPEG':
+            img.draft('RGB', (
+                max(rendition.size[0] for rendition in renditions),
+                max(rendition.size[1] for rendition in renditions)
+            ))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        sources = {None: img}
+        results = {}
+        for index, rendition in enumerate(renditions):
+            source = sources[rendition.source]
+            # Shrink the source in place unless a later rendition needs it
+            if rendition.source in [
+                later.source for later in renditions[index + 1:]
+            ]:
+                source = source.copy()
+            sources[rendition.field] = source
+            results[rendition.field] = self.image_resize(
+                rendition.size, source, name
+            )
+        return results
+
+
+def rendition_names(original):
+    """
+    Names of the renditions of a content addressed original by field, None
+    for the originals stored before.
+    """
+    if not original.name.startswith(CAS_ROOT + '/'):
+        return None
+    digest = os.path.splitext(os.path.basename(original.name))[0]
+    return dict(
+        (
+            rendition.field,
+            blob_path(digest, '_%s_%sx%s.jpg' % (
+                rendition.field, rendition.size[0], rendition.size[1]
+            ))
+        ) for rendition in RENDITIONS
+    )
+
+
+def touch(storage, name):
+    """
+    Refresh the modification time of a stored blob, so the garbage
+    collector keeps it while it is being referenced again. False when the
+    blob is gone.
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return storage.exists(name)
+    try:
+        os.utime(path, None)
+    except OSError:
+        return False
+    return True
+
+
+def ingest(instance):
+    """
+    Save an ImagePost or ProfileImage with a new `original`. The renditions
+    are reused when the same image was already processed, and made in
+    background otherwise.
+    """
+    instance.state = PROCESSING
+    instance.save()
+    names = rendition_names(instance.original)
+    storage = instance.original.storage
+    # The renditions may be left over from a deleted image, touched before
+    # they are referenced so a concurrent collect_garbage keeps them
+    if names and all(touch(storage, name) for name in names.values()):
+        for field, name in names.items():
+            setattr(instance, field, name)
+        instance.state = READY
+        instance.save(update_fields=list(names) + ['state'])
+    else:
+        render_later(instance)
+
+
+def render_later(instance):
+    """
+    Generate the renditions of the `original` of an ImagePost or
+    ProfileImage in the images queue. The instance is expected to be saved
+    in the PROCESSING state.
+    """
+    queue.push(
+        IMAGES_QUEUE,
+        'TapVet.images.render',
+        [instance._meta.label, instance.pk]
+    )
+
+
+def render(label, pk):
+    instance = apps.get_model(label).objects.filter(pk=pk).first()
+    if instance is None or not instance.original:
+        return
+    name = os.path.basename(instance.original.name)
+    names = rendition_names(instance.original)
+    storage = instance.original.storage
+    try:
+        with mapped(instance.original) as image_file:
+            for field, image in ImageSerializerMixer().image_renditions(
+                image_file, name
+            ).items():
+                if names:
+                    image = storage.save(names[field], image)
+                setattr(instance, field, image)
+        instance.state = READY
+    except (IOError, ValueError):
+        logger.exception('Rendering %s %s failed', label, pk)
+        instance.state = FAILED
+    instance.save(update_fields=[
+        rendition.field for rendition in RENDITIONS
+    ] + ['state'])
+
+
+def renditions_ready(instance):
+    return dict(
+        (rendition.field, bool(getattr(instance, rendition.field)))
+        for rendition in RENDITIONS
+    )
+
+
+def referenced_blobs():
+    names = set()
+    for label, fields in IMAGE_FIELDS:
+        model = apps.get_model(label)
+        for field in fields:
+            names.update(model.objects.filter(**{
+                field + '__startswith': CAS_ROOT + '/'
+            }).values_list(field, flat=True))
+    return names
+
+
+def collect_garbage(storage, grace, dry_run=False):
+    """
+    Delete the content addressed files no image field refers to anymore,
+    like the ones of deleted post images or replaced profile images. The
+    files touched during the last `grace` seconds are kept, they may belong
+    to an upload in progress. Returns the names deleted.
+    """
+    if not storage.exists(CAS_ROOT):
+        return []
+    referenced = referenced_blobs()
+    limit = timezone.now() - timedelta(seconds=grace)
+    deleted = []
+    directories, _ = storage.listdir(CAS_ROOT)
+    for directory in directories:
+        _, files = storage.listdir('/'.join([CAS_ROOT, directory]))
+        for filename in files:
+            name = '/'.join([CAS_ROOT, directory, filename])
+            if name in referenced or storage.get_modified_time(name) > limit:
+                continue
+            if not dry_run:
+                storage.delete(name)
+            deleted.append(name)
+    return deleted
@@ -11,6 +11,9 @@ permission = "You don't have permission to edit."
 one_image = "A post needs at least one image."
 too_much_images = {"detail": "You can't have more than three images."}
 image_required = {"detail": "Image field required."}
+image_too_large = "The image file is too large."
+image_too_many_pixels = "The image resolution is too high."
+image_invalid = "Upload a valid image."
 comment_permission = {"detail": "You don't have permission to comment."}
 follow_permission = {
     "detail": "You don't have permission to follow this user."
@@ -0,0 +1,214 @@
+"""
+Request instrumentation.
+
+MetricsMiddleware times every request and splits the time in spans: the
+database queries, the serialization, the signal handlers and the calls to
+external services (push notifications, SendGrid, Stripe). The spans of a
+request are sent back in a Server-Timing header and added to per view and
+method histograms, served in the Prometheus text format by the dashboard
+metrics service.
+
+The spans overlap: the queries run by a signal handler count in both.
+The histograms are kept by each process; scrape every worker, or sum them,
+to get the whole picture. Code outside a request, like the background
+jobs, is not measured.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db.backends.utils import CursorWrapper
+from django.db.models.signals import post_init, pre_init
+from django.dispatch import Signal
+from rest_framework.serializers import BaseSerializer
+
+SPANS = ('db', 'serializer', 'signals', 'external')
+
+# Other methods are recorded as 'other', so clients cannot add histograms
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+# Sent for every model instance, by Django itself, not timed
+UNTIMED_SIGNALS = (pre_init, post_init)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# (view, method) -> {'buckets': [...], 'count', 'sum', 'spans', 'queries'}
+histograms = OrderedDict()
+
+
+def current():
+    return getattr(_local, 'spans', None)
+
+
+@contextmanager
+def timed(span):
+    """
+    Add the time of the block to `span` of the current request. Nested
+    blocks of the same span are only counted once.
+    """
+    spans = current()
+    if spans is None or span in _local.open_spans:
+        yield
+        return
+    _local.open_spans.add(span)
+    start = time.time()
+    try:
+        yield
+    finally:
+        spans[span] = spans.get(span, 0) + time.time() - start
+        _local.open_spans.discard(span)
+
+
+def timed_query(execute):
+    """Count the query and add its time to the 'db' span."""
+    @wraps(execute)
+    def wrapper(cursor, *args, **kwargs):
+        if current() is None:
+            return execute(cursor, *args, **kwargs)
+        _local.queries += 1
+        with timed('db'):
+            return execute(cursor, *args, **kwargs)
+    return wrapper
+
+
+def install():
+    """
+    Time the queries, the top level serializations and the dispatching of
+    the signals with receivers, but the model init ones. They have no hook
+    of their own, so their entry points are wrapped once. The debug cursor
+    runs the queries through the wrapped methods too.
+    """
+    if getattr(BaseSerializer, '_timed', False):
+        return
+    data = BaseSerializer.data
+    send = Signal.send
+
+    def timed_data(serializer):
+        with timed('serializer'):
+            return data.fget(serializer)
+
+    @wraps(send)
+    def timed_send(signal, sender, **named):
+        if not signal.receivers or signal in UNTIMED_SIGNALS:
+            return send(signal, sender, **named)
+        with timed('signals'):
+            return send(signal, sender, **named)
+    BaseSerializer.data = property(timed_data)
+    BaseSerializer._timed = True
+    Signal.send = timed_send
+    CursorWrapper.execute = timed_query(CursorWrapper.execute)
+    CursorWrapper.executemany = timed_query(CursorWrapper.executemany)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view = getattr(match.func, 'view_class', match.func)
+    return '%s.%s' % (view.__module__, view.__name__)
+
+
+def record(view, method, seconds, spans, queries):
+    key = (view, method)
+    with _lock:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = {
+                'buckets': [0] * len(settings.METRICS_BUCKETS),
+                'count': 0,
+                'sum': 0.0,
+                'spans': dict((span, 0.0) for span in SPANS),
+                'queries': 0,
+            }
+        for index, bound in enumerate(settings.METRICS_BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][index] += 1
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+        histogram['queries'] += queries
+        for span in SPANS:
+            histogram['spans'][span] += spans.get(span, 0)
+
+
+def server_timing(seconds, spans, queries):
+    entries = ['%s;dur=%.1f' % (span, spans.get(span, 0) * 1000)
+               for span in SPANS]
+    entries[0] += ';desc="%s queries"' % queries
+    entries.append('total;dur=%.1f' % (seconds * 1000))
+    return ', '.join(entries)
+
+
+def prometheus():
+    """Histograms in the Prometheus text exposition format."""
+    lines = [
+        '# HELP tapvet_request_duration_seconds Time to serve a request.',
+        '# TYPE tapvet_request_duration_seconds histogram',
+    ]
+    spans, queries = [], []
+    with _lock:
+        for (view, method), histogram in histograms.items():
+            labels = 'view="%s",method="%s"' % (view, method)
+            for bound, count in zip(
+                settings.METRICS_BUCKETS, histogram['buckets']
+            ):
+                lines.append(
+                    'tapvet_request_duration_seconds_bucket{%s,le="%s"} %s'
+                    % (labels, bound, count)
+                )
+            lines.append(
+                'tapvet_request_duration_seconds_bucket{%s,le="+Inf"} %s'
+                % (labels, histogram['count'])
+            )
+            lines.append('tapvet_request_duration_seconds_sum{%s} %f' % (
+                labels, histogram['sum']
+            ))
+            lines.append('tapvet_request_duration_seconds_count{%s} %s' % (
+                labels, histogram['count']
+            ))
+            for span in SPANS:
+                spans.append('tapvet_request_span_seconds_total{%s,span="%s"}'
+                             ' %f' % (labels, span, histogram['spans'][span]))
+            queries.append('tapvet_request_queries_total{%s} %s' % (
+                labels, histogram['queries']
+            ))
+    lines += [
+        '# HELP tapvet_request_span_seconds_total Time spent in each span.',
+        '# TYPE tapvet_request_span_seconds_total counter',
+    ] + spans + [
+        '# HELP tapvet_request_queries_total Database queries run.',
+        '# TYPE tapvet_request_queries_total counter',
+    ] + queries
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware(object):
+    """
+    Outermost middleware, so the measured time covers the others. The
+    queries of every connection are counted and timed by the cursors, see
+    `install`, without keeping their SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        _local.spans, _local.open_spans = {}, set()
+        _local.queries = 0
+        start = time.time()
+        try:
+            response = self.get_response(request)
+        finally:
+            seconds = time.time() - start
+            spans, queries = _local.spans, _local.queries
+            _local.spans = None
+        response['Server-Timing'] = server_timing(seconds, spans, queries)
+        method = request.method if request.method in METHODS else 'other'
+        record(view_name(request), method, seconds, spans, queries)
+        return response
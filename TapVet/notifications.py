@@ -0,0 +1,81 @@
+"""
+Push notification dispatcher.
+
+The request only appends the notification to the pending buffer and
+schedules a flush on the notifications queue. A flush takes a batch of
+pending notifications, groups them by message and sends every group with
+one multicast call per platform. The groups that fail are retried later
+with an exponential backoff.
+"""
+import logging
+from ssl import SSLError
+
+from django.conf import settings
+from django.utils.six.moves.urllib.error import URLError
+from push_notifications.models import GCMDevice, APNSDevice
+from push_notifications import NotificationError
+
+from . import metrics, queue
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_QUEUE = 'notifications'
+
+PLATFORMS = {
+    'gcm': GCMDevice,
+    'apns': APNSDevice
+}
+
+pending = queue.Buffer('notifications')
+
+
+def enqueue(user_id, message):
+    queue.defer(pending.append, {'user_id': user_id, 'message': message})
+    queue.push(NOTIFICATIONS_QUEUE, 'TapVet.notifications.flush')
+
+
+def flush():
+    """Send the oldest pending notifications, returns how many."""
+    items = pending.take(settings.NOTIFICATIONS_BATCH_SIZE)
+    send(items)
+    return len(items)
+
+
+def send(items, attempt=0):
+    groups = {}
+    for item in items:
+        for platform in [item['platform']] if 'platform' in item \
+                else PLATFORMS:
+            groups.setdefault(
+                (platform, item['message']), set()
+            ).add(item['user_id'])
+    for (platform, message), user_ids in groups.items():
+        devices = PLATFORMS[platform].objects.filter(
+            user_id__in=user_ids,
+            active=True
+        )
+        try:
+            if devices.exists():
+                with metrics.timed('external'):
+                    devices.send_message(message)
+        except (NotificationError, URLError, SSLError):
+            logger.warning(
+                'Sending %s notifications failed, attempt %s',
+                platform, attempt + 1, exc_info=True
+            )
+            retry(platform, message, user_ids, attempt + 1)
+
+
+def retry(platform, message, user_ids, attempt):
+    if attempt >= settings.NOTIFICATIONS_MAX_ATTEMPTS:
+        return
+    items = [
+        {'user_id': user_id, 'message': message, 'platform': platform}
+        for user_id in user_ids
+    ]
+    queue.push(
+        NOTIFICATIONS_QUEUE,
+        'TapVet.notifications.send',
+        [items, attempt],
+        delay=settings.NOTIFICATIONS_RETRY_DELAY * 2 ** (attempt - 1)
+    )
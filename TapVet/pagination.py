@@ -1,4 +1,16 @@
+import base64
+import json
+import operator
+from collections import OrderedDict
+from datetime import date
+from functools import reduce
+
+from django.db.models import Q
+from django.utils import six
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardPagination(PageNumberPagination):
@@ -11,3 +23,145 @@ class CardsPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = 'page_size'
     max_page_size = 20
+
+
+class KeysetPagination(StandardPagination):
+    """
+    Page number pagination that switches to keyset pagination when the
+    client sends the `cursor` query param (empty for the first page).
+
+    Keyset pages are read after the position of the last item of the
+    previous page, following the ordering of the queryset with the id as
+    tie breaker, so neither the COUNT(*) nor the OFFSET scan are issued.
+    Querysets that rank their items in another way can expose a
+    `keyset_page(position, limit)` method returning the page items and the
+    position of the next page.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super(KeysetPagination, self).paginate_queryset(
+                queryset, request, view
+            )
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        if hasattr(queryset, 'keyset_page'):
+            results, self.next_position = queryset.keyset_page(
+                position, self.page_size
+            )
+        else:
+            results, self.next_position = self.keyset_page(
+                queryset, position
+            )
+        return list(results)
+
+    def keyset_page(self, queryset, position):
+        ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*ordering)
+        if position:
+            if len(position) != len(ordering):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self.after(ordering, position))
+        results = list(queryset[:self.page_size + 1])
+        if len(results) <= self.page_size:
+            return results, None
+        results = results[:self.page_size]
+        return results, [
+            self.position_value(getattr(results[-1], field.lstrip('-')))
+            for field in ordering
+        ]
+
+    @staticmethod
+    def get_ordering(queryset):
+        ordering = list(queryset.query.order_by) or ['-id']
+        if not set(['id', '-id', 'pk', '-pk']) & set(ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Rows following `position`, the values of the ordering fields of the
+        last row already served.
+        """
+        branches = []
+        for index, field in enumerate(ordering):
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            branch = Q(**{field.lstrip('-') + lookup: position[index]})
+            for previous, value in zip(ordering[:index], position[:index]):
+                branch &= Q(**{previous.lstrip('-'): value})
+            branches.append(branch)
+        return reduce(operator.or_, branches)
+
+    @staticmethod
+    def position_value(value):
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    def encode_cursor(self, position):
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(position).encode('ascii')
+        )
+        return cursor.decode('ascii')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            position = json.loads(
+                base64.urlsafe_b64decode(
+                    cursor.encode('ascii')
+                ).decode('ascii')
+            )
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or not all(
+            isinstance(value, (six.string_types, six.integer_types, float))
+            for value in position
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super(KeysetPagination, self).get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super(KeysetPagination, self).get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data)
+        ]))
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Pagination of the feed, the page size defaults to the post quantity of
+    the audience when the feed gives one.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = getattr(queryset, 'page_size', None) or \
+            self.page_size
+        return super(FeedPagination, self).paginate_queryset(
+            queryset, request, view
+        )
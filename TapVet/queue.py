@@ -0,0 +1,200 @@
+"""
+Background job queue.
+
+A job is the dotted path of a function plus its JSON serializable
+arguments. When QUEUE_REDIS_URL is set the jobs are pushed on a Redis list
+and run by the `run_worker` management command, otherwise a daemon thread
+of the web process runs them. With QUEUE_ALWAYS_EAGER the jobs run inline,
+which is what the tests use.
+
+Every queue the jobs are pushed to has to be listed in QUEUE_NAMES, the
+queues `run_worker` consumes when none are given.
+
+Jobs are pushed once the current transaction commits, so the worker always
+sees the rows the request wrote. A job can be delayed, for retries, and
+batch jobs can collect their items in a `Buffer`.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+from django.utils.six.moves import queue as local_queue
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+
+_redis = []
+_local = {}
+_lock = threading.Lock()
+
+
+def get_redis():
+    """Shared Redis client, None when no Redis is configured."""
+    if not _redis:
+        url = getattr(settings, 'QUEUE_REDIS_URL', None)
+        _redis.append(
+            redis.StrictRedis.from_url(url) if url and redis else None
+        )
+    return _redis[0]
+
+
+def queue_key(queue):
+    return 'tapvet:queue:%s' % queue
+
+
+def scheduled_key(queue):
+    return 'tapvet:queue:%s:scheduled' % queue
+
+
+def defer(func, *args):
+    """Call `func` once the current transaction commits."""
+    if settings.QUEUE_ALWAYS_EAGER:
+        func(*args)
+    else:
+        transaction.on_commit(lambda: func(*args))
+
+
+def enqueue(task, *args, **kwargs):
+    """Run `task`, a dotted path, with the given arguments in background."""
+    push(DEFAULT_QUEUE, task, args, kwargs)
+
+
+def push(queue, task, args=(), kwargs=None, delay=0):
+    """Run `task` from the worker of `queue`, `delay` seconds from now."""
+    job = json.dumps({
+        'task': task,
+        'args': list(args),
+        'kwargs': kwargs or {}
+    })
+    if settings.QUEUE_ALWAYS_EAGER:
+        run(job)
+    else:
+        transaction.on_commit(lambda: deliver(queue, job, delay))
+
+
+def deliver(queue, job, delay=0):
+    client = get_redis()
+    if client is not None:
+        if delay:
+            client.zadd(scheduled_key(queue), time.time() + delay, job)
+        else:
+            client.rpush(queue_key(queue), job)
+    elif delay:
+        timer = threading.Timer(delay, local_worker(queue).put, (job,))
+        timer.daemon = True
+        timer.start()
+    else:
+        local_worker(queue).put(job)
+
+
+def promote(client, queue):
+    """Move the delayed jobs of `queue` that are due to its list."""
+    key = scheduled_key(queue)
+    for job in client.zrangebyscore(key, 0, time.time()):
+        if client.zrem(key, job):
+            client.rpush(queue_key(queue), job)
+
+
+class Buffer(object):
+    """
+    Items waiting for a batch job, kept in a Redis list or, without Redis,
+    in the memory of the process.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.items = deque()
+
+    @property
+    def key(self):
+        return 'tapvet:buffer:%s' % self.name
+
+    def append(self, item):
+        client = get_redis()
+        if client is not None:
+            client.rpush(self.key, json.dumps(item))
+        else:
+            self.items.append(item)
+
+    def take(self, count):
+        """Remove and return up to `count` of the oldest items."""
+        client = get_redis()
+        if client is None:
+            items = []
+            try:
+                while len(items) < count:
+                    items.append(self.items.popleft())
+            except IndexError:
+                pass
+            return items
+        pipe = client.pipeline()
+        pipe.lrange(self.key, 0, count - 1)
+        pipe.ltrim(self.key, count, -1)
+        items, _ = pipe.execute()
+        return [json.loads(item.decode('utf-8')) for item in items]
+
+
+def run(job):
+    job = json.loads(job)
+    try:
+        import_string(job['task'])(*job['args'], **job['kwargs'])
+    except Exception:
+        logger.exception('Job %s failed', job['task'])
+        if settings.QUEUE_ALWAYS_EAGER:
+            raise
+
+
+def local_worker(queue):
+    """In process queue of `queue`, consumed by a daemon thread."""
+    with _lock:
+        if queue not in _local:
+            jobs = _local[queue] = local_queue.Queue()
+            thread = threading.Thread(
+                target=consume, args=(jobs,), name='queue-%s' % queue
+            )
+            thread.daemon = True
+            thread.start()
+    return _local[queue]
+
+
+def consume(jobs):
+    while True:
+        job = jobs.get()
+        try:
+            run(job)
+        finally:
+            close_old_connections()
+
+
+def work(queues, burst=False, timeout=5):
+    """
+    Run the jobs pushed on the Redis lists of `queues`. With `burst` it
+    returns once they are empty, and gives back the number of jobs run.
+    """
+    client = get_redis()
+    if client is None:
+        raise RuntimeError('QUEUE_REDIS_URL is not configured')
+    keys = [queue_key(queue) for queue in queues]
+    done = 0
+    while True:
+        for queue in queues:
+            promote(client, queue)
+        item = client.blpop(keys, timeout=timeout)
+        if item is None:
+            if burst:
+                return done
+            continue
+        close_old_connections()
+        run(item[1].decode('utf-8'))
+        done += 1
@@ -0,0 +1,164 @@
+"""
+Cache of the reference data the apps load on launch: countries, states,
+groups, app texts, pet types and areas of interest.
+
+The serialized lists are kept in the REFERENCE_CACHE alias of CACHES under
+a version stamp, the time of the last write to any of the watched models,
+admin and dashboard included. The stamp lives in the Redis of the queue so
+every process sees the same one, in REFERENCE_CACHE when there is no
+Redis. The stamp is also the ETag of the responses, so the apps revalidate
+with If-None-Match and get a 304 until something changes. BootstrapView
+returns every list in one response.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_save, post_delete
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import queue
+
+VERSION_KEY = 'reference:version'
+
+
+def get_cache():
+    return caches[settings.REFERENCE_CACHE]
+
+
+def get_version():
+    client = queue.get_redis()
+    if client is not None:
+        version = client.get(VERSION_KEY)
+        if version is None:
+            client.set(VERSION_KEY, time.time(), nx=True)
+            version = client.get(VERSION_KEY)
+        return float(version)
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time()
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+def bump_version():
+    client = queue.get_redis()
+    if client is not None:
+        client.set(VERSION_KEY, time.time())
+    else:
+        get_cache().set(VERSION_KEY, time.time(), None)
+
+
+def changed(sender, **kwargs):
+    queue.defer(bump_version)
+
+
+def watch(model):
+    """Bump the version on every write to `model`."""
+    uid = 'TapVet.reference.%s' % model._meta.label_lower
+    post_save.connect(changed, sender=model, dispatch_uid=uid + '.save')
+    post_delete.connect(changed, sender=model, dispatch_uid=uid + '.delete')
+
+
+def get_etag(key, version):
+    return '"%s"' % hashlib.sha1(
+        ('%r:%s' % (version, key)).encode('utf-8')
+    ).hexdigest()
+
+
+def get_data(key, build, version):
+    cache = get_cache()
+    cache_key = 'reference:%s' % get_etag(key, version).strip('"')
+    data = cache.get(cache_key)
+    if data is None:
+        data = build()
+        cache.set(cache_key, data, settings.REFERENCE_CACHE_TTL)
+    return data
+
+
+def respond(request, key, build):
+    """Response with the data of `key`, or 304 if the client has it."""
+    version = get_version()
+    etag = get_etag(key, version)
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(build(version))
+    response['ETag'] = etag
+    return response
+
+
+class ReferenceListMixin(object):
+    """
+    List view of reference data served from the cache. `reference_key`
+    names the list, views whose list depends on the request override
+    `get_reference_key`.
+    """
+    reference_key = None
+
+    def get_reference_key(self):
+        return self.reference_key
+
+    def get_reference_data(self):
+        return list(self.get_serializer(self.get_queryset(), many=True).data)
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_reference_key()
+        return respond(
+            request,
+            key,
+            lambda version: get_data(key, self.get_reference_data, version)
+        )
+
+
+class BootstrapView(APIView):
+    """
+    Service to get every reference list in one round trip. Pet types and
+    areas of interest are only listed to authenticated users, like their
+    own services.
+
+    :accepted methods:
+        GET
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    def get_sections(self):
+        # Imported here, the models of these apps import this module
+        from apptexts.views import AppTextView
+        from countries.views import CountryListView, StateListView
+        from pets.views import PetTypeListView
+        from users.views import AreaInterestListView, GroupsListView
+
+        sections = [
+            ('countries', CountryListView),
+            ('states', StateListView),
+            ('groups', GroupsListView),
+            ('app_texts', AppTextView),
+        ]
+        if self.request.user.is_authenticated():
+            sections += [
+                ('pet_types', PetTypeListView),
+                ('area_interests', AreaInterestListView),
+            ]
+        for name, view_class in sections:
+            view = view_class(
+                request=self.request, args=(), kwargs={},
+                format_kwarg=None
+            )
+            yield name, view
+
+    def get(self, request, *args, **kwargs):
+        sections = list(self.get_sections())
+        key = 'bootstrap:%s' % ','.join(
+            view.get_reference_key() for _, view in sections
+        )
+        return respond(request, key, lambda version: dict(
+            (name, get_data(
+                view.get_reference_key(), view.get_reference_data, version
+            ))
+            for name, view in sections
+        ))
@@ -0,0 +1,227 @@
+"""
+On demand renditions of the post and profile images.
+
+`/api/v1/images/<kind>/<pk>/<version>/?w=<width>` serves the image resized
+to the smallest width bucket covering the requested width, as WebP when the
+client accepts it and JPEG otherwise. Renditions are cached on disk under
+RENDITIONS_CACHE_DIR, the least recently served ones are evicted once the
+cache grows over RENDITIONS_CACHE_SIZE bytes.
+
+The version is derived from the name of the stored file, content addressed
+for the new uploads. A URL is only known from the serialized image, so the
+images cannot be listed by walking the ids, and it changes with the image,
+so the responses can be cached for good. The images of deactivated posts
+and users are not served.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from io import BytesIO
+
+from PIL import Image as Img
+from django.apps import apps
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.http import FileResponse, HttpResponseNotModified, Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.generic import View
+
+from . import images
+
+# Model of each kind of image and the filters of the ones served
+KINDS = {
+    'posts': ('posts.ImagePost', {'post__active': True}),
+    'profiles': ('users.ProfileImage', {'user__is_active': True}),
+}
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+def width_bucket(width):
+    widths = settings.RENDITIONS_WIDTHS
+    for bucket in widths:
+        if bucket >= width:
+            return bucket
+    return widths[-1]
+
+
+def webp_supported():
+    Img.init()
+    return 'WEBP' in Img.SAVE
+
+
+def negotiate_format(accept):
+    if 'image/webp' in accept and webp_supported():
+        return 'webp'
+    return 'jpeg'
+
+
+def source_file(instance):
+    """Largest stored file of the image, the original when kept."""
+    return getattr(instance, 'original', None) or instance.standard
+
+
+def source_version(source):
+    return hashlib.sha1(source.name.encode('utf-8')).hexdigest()[:16]
+
+
+def render(source, width, image_format):
+    with images.mapped(source) as image_file:
+        img = Img.open(image_file)
+        images.check_pixels(img)
+        if img.format == 'JPEG':
+            img.draft('RGB', (width, width))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        if img.size[0] > width:
+            img = img.resize(
+                (width, max(1, img.size[1] * width // img.size[0])),
+                Img.ANTIALIAS
+            )
+        output = BytesIO()
+        img.save(
+            output,
+            format=FORMATS[image_format][0],
+            quality=settings.RENDITIONS_QUALITY
+        )
+    return output.getvalue()
+
+
+class DiskLRU(object):
+    """
+    Files of a directory evicted by last use once their total size goes
+    over `capacity` bytes. Reads touch the file so the modification time
+    is the last use, and hand out an open file so a concurrent eviction
+    cannot remove it before it is served.
+    """
+
+    def __init__(self, directory, capacity):
+        self.directory = directory
+        self.capacity = capacity
+        self.size = None
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Open file of `key`, None when it is not cached."""
+        path = self.path(key)
+        try:
+            cached_file = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return cached_file
+
+    def put(self, key, data):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        handle, temporary = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as temporary_file:
+            temporary_file.write(data)
+        os.rename(temporary, self.path(key))
+        with self.lock:
+            if self.size is None:
+                self.evict()
+            else:
+                self.size += len(data)
+                if self.size > self.capacity:
+                    self.evict()
+        return self.path(key)
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        self.size = sum(size for _, size, _ in entries)
+        # Leave some room so the next writes do not evict again
+        target = self.capacity * 9 // 10
+        for _, size, name in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            self.size -= size
+
+
+cache = DiskLRU(settings.RENDITIONS_CACHE_DIR, settings.RENDITIONS_CACHE_SIZE)
+
+
+def srcset(kind, instance, request=None):
+    """`srcset` attribute listing the rendition of every width bucket."""
+    source = source_file(instance)
+    if not source:
+        return ''
+    url = reverse('renditions', kwargs={
+        'kind': kind, 'pk': instance.pk, 'version': source_version(source)
+    })
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return ', '.join(
+        '%s?w=%s %sw' % (url, width, width)
+        for width in settings.RENDITIONS_WIDTHS
+    )
+
+
+class RenditionView(View):
+    """
+    Service to get a post or profile image at a given width.
+
+    :accepted methods:
+        GET
+    """
+
+    def get(self, request, kind, pk, version):
+        label, filters = KINDS[kind]
+        instance = get_object_or_404(
+            apps.get_model(label), pk=pk, **filters
+        )
+        source = source_file(instance)
+        if not source or source_version(source) != version:
+            raise Http404()
+        try:
+            width = width_bucket(int(request.GET.get('w', 0)))
+        except ValueError:
+            raise Http404()
+        image_format = negotiate_format(request.META.get('HTTP_ACCEPT', ''))
+        key = hashlib.sha1(
+            ('%s:%s:%s:%s' % (
+                source.name, width, image_format,
+                settings.RENDITIONS_QUALITY
+            )).encode('utf-8')
+        ).hexdigest()
+        etag = '"%s"' % key
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            rendition = cache.get(key)
+            if rendition is None:
+                try:
+                    data = render(source, width, image_format)
+                except (IOError, ValueError):
+                    raise Http404()
+                cache.put(key, data)
+                rendition = BytesIO(data)
+            response = FileResponse(
+                rendition, content_type=FORMATS[image_format][1]
+            )
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept',))
+        patch_cache_control(response, public=True, max_age=31536000)
+        return response
@@ -60,6 +60,7 @@ THIRD_PARTY_APPS = (
 INSTALLED_APPS = DJANGO_APPS + INTERNAL_APPS + THIRD_PARTY_APPS
 
 MIDDLEWARE = [
+    'TapVet.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -204,3 +205,87 @@ PUSH_NOTIFICATIONS_SETTINGS = {
     "APNS_CERTIFICATE": os.environ.get('PATH_TO_CERTIFICATE')
 }
 SEND_MAILS = True
+
+# Serve the authenticated feed from the posts.feed store instead of scoring
+# every post on each request
+FEED_MATERIALIZED = True
+FEED_RANKING_ENGINE = 'posts.ranking.WeightedRanking'
+# Seconds a process keeps the FeedVariable weights it loaded
+FEED_WEIGHTS_TTL = 300
+# Post.recency halves every FEED_RECENCY_HALF_LIFE hours and is zero after
+# FEED_RECENCY_HORIZON days
+FEED_RECENCY_HALF_LIFE = 24
+FEED_RECENCY_HORIZON = 30
+
+# Background jobs go to this Redis when set, see TapVet.queue. Without it
+# they run in a thread of the web process
+QUEUE_REDIS_URL = os.environ.get('REDIS_URL')
+QUEUE_ALWAYS_EAGER = False
+# Queues consumed by run_worker when none are given, in priority order. Every
+# queue the jobs are pushed to has to be listed
+QUEUE_NAMES = ('notifications', 'default', 'mails', 'images')
+
+# Push notifications sent per multicast batch, and retries of a failed batch
+# waiting NOTIFICATIONS_RETRY_DELAY seconds, doubled on each attempt
+NOTIFICATIONS_BATCH_SIZE = 500
+NOTIFICATIONS_MAX_ATTEMPTS = 5
+NOTIFICATIONS_RETRY_DELAY = 30
+
+# SendGrid mails are sent from the mails queue through a pooled session,
+# the failed ones are retried like the push notifications
+MAILS_POOL_SIZE = 10
+MAILS_TIMEOUT = 10
+MAILS_MAX_ATTEMPTS = 5
+MAILS_RETRY_DELAY = 60
+
+# Token lookups cached by TapVet.authentication, per process for
+# TOKEN_CACHE_TTL seconds and in Redis, when set, for TOKEN_CACHE_REDIS_TTL
+TOKEN_CACHE_TIERS = (
+    'TapVet.authentication.LocalTokenTier',
+    'TapVet.authentication.RedisTokenTier',
+)
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 30
+TOKEN_CACHE_REDIS_TTL = 600
+
+# Uploads over this size are spooled to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+# Images refused before they are decoded
+IMAGE_MAX_BYTES = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+# Keeps a single copy of the content addressed images, see TapVet.images
+DEFAULT_FILE_STORAGE = 'TapVet.images.ContentAddressedStorage'
+
+# On demand image renditions, see TapVet.renditions
+RENDITIONS_WIDTHS = (150, 320, 480, 612, 828, 1080)
+RENDITIONS_QUALITY = 70
+RENDITIONS_CACHE_DIR = os.environ.get(
+    'RENDITIONS_CACHE_DIR', os.path.join(BASE_DIR, 'renditions')
+)
+RENDITIONS_CACHE_SIZE = 1024 * 1024 * 1024
+
+# Anonymous feed pages, see posts.page_cache. They are kept in the Redis of
+# QUEUE_REDIS_URL, in the FEED_CACHE alias of CACHES only when there is none
+FEED_CACHE = 'default'
+# Seconds a page is served as is, then served stale while one request
+# refreshes it, for FEED_CACHE_STALE_TTL seconds more at most
+FEED_CACHE_TTL = 30
+FEED_CACHE_STALE_TTL = 600
+FEED_CACHE_LOCK_TIMEOUT = 30
+
+# Reference data lists, see TapVet.reference. The version stamp is kept in
+# the Redis of QUEUE_REDIS_URL, in REFERENCE_CACHE only when there is none
+REFERENCE_CACHE = 'default'
+REFERENCE_CACHE_TTL = 24 * 60 * 60
+
+# Follow graph sets, see users.graph. FOLLOW_GRAPH_SIZE is the number of
+# sets a process keeps, for FOLLOW_GRAPH_TTL seconds
+FOLLOW_GRAPH_SIZE = 20000
+FOLLOW_GRAPH_TTL = 30
+FOLLOW_GRAPH_REDIS_TTL = 60 * 60
+
+# Request instrumentation, see TapVet.metrics. Bounds in seconds of the
+# request duration histograms
+METRICS_ENABLED = True
+METRICS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
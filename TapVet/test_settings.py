@@ -1,3 +1,5 @@
+import tempfile
+
 from .settings import *  #noqa
 
 DATABASES = {
@@ -10,3 +12,26 @@ DATABASES = {
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 
 SEND_MAILS = False
+
+# Reload the FeedVariable weights on every use, each test has its own rows
+FEED_WEIGHTS_TTL = 0
+
+# Background jobs run inline, and never reach a Redis
+QUEUE_ALWAYS_EAGER = True
+QUEUE_REDIS_URL = None
+
+# Rendered images go away with the test run
+RENDITIONS_CACHE_DIR = tempfile.mkdtemp()
+
+# Anonymous feed pages are always refreshed unless a test sets a TTL
+FEED_CACHE_TTL = 0
+
+# Reference lists are rebuilt on every request, the tests reset the tables
+REFERENCE_CACHE_TTL = 0
+
+# Follow sets are reloaded on every use, the tests reuse the user ids
+FOLLOW_GRAPH_TTL = 0
+
+# Uploads, and the content addressed files the tests garbage collect, go
+# away with the test run
+MEDIA_ROOT = tempfile.mkdtemp()
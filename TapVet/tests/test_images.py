@@ -0,0 +1,85 @@
+"""Testing the image renditions"""
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import override_settings
+from mixer.backend.django import mixer
+
+from helpers.tests_helpers import CustomTestCase
+from posts.models import ImagePost
+from TapVet import images, renditions
+
+pytestmark = pytest.mark.django_db
+
+
+def upload(color, size=(800, 400)):
+    output = BytesIO()
+    Image.new('RGB', size, color).save(output, format='JPEG')
+    return SimpleUploadedFile('upload.jpg', output.getvalue())
+
+
+class TestImages(CustomTestCase):
+
+    def image_post(self, original):
+        user = self.load_users_data().get_user(groups_id=1)
+        return ImagePost(
+            original=original,
+            post=mixer.blend('posts.Post', user=user),
+            image_number=1
+        )
+
+    def test_render(self):
+        image_post = self.image_post(upload('red'))
+        with override_settings(QUEUE_ALWAYS_EAGER=False):
+            images.ingest(image_post)
+        assert image_post.state == images.PROCESSING
+        images.render('posts.ImagePost', image_post.pk)
+        image_post = ImagePost.objects.get(pk=image_post.pk)
+        assert image_post.state == images.READY
+        names = images.rendition_names(image_post.original)
+        assert image_post.standard.name == names['standard']
+        assert image_post.thumbnail.name == names['thumbnail']
+        assert Image.open(image_post.standard).size == (612, 306)
+        assert Image.open(image_post.thumbnail).size == (150, 75)
+
+    def test_render_failed(self):
+        image_post = self.image_post(
+            SimpleUploadedFile('upload.jpg', b'not an image')
+        )
+        with override_settings(QUEUE_ALWAYS_EAGER=False):
+            images.ingest(image_post)
+        images.render('posts.ImagePost', image_post.pk)
+        image_post = ImagePost.objects.get(pk=image_post.pk)
+        assert image_post.state == images.FAILED
+        assert not image_post.standard
+
+    def test_ingest_reuses_renditions(self):
+        first = self.image_post(upload('blue'))
+        images.ingest(first)
+        # Rendered by the job, which saves its own copy of the row
+        first.refresh_from_db()
+        assert first.state == images.READY
+        second = self.image_post(upload('blue'))
+        # Nothing is rendered outside of the eager mode, in the test
+        # transaction, so a READY image was not rendered again
+        with override_settings(QUEUE_ALWAYS_EAGER=False):
+            images.ingest(second)
+        assert second.state == images.READY
+        assert second.original.name == first.original.name
+        assert second.standard.name == first.standard.name
+
+
+class TestRenditionsCache(object):
+
+    def test_get_hands_out_open_file(self, tmpdir):
+        cache = renditions.DiskLRU(str(tmpdir), 1024)
+        assert cache.get('key') is None
+        cache.put('key', b'data')
+        cached_file = cache.get('key')
+        # Evicted by another request before it is served
+        renditions.DiskLRU(str(tmpdir), 0).evict()
+        with cached_file:
+            assert cached_file.read() == b'data'
+        assert cache.get('key') is None
@@ -0,0 +1,50 @@
+"""Testing the request instrumentation"""
+import pytest
+from django.db import connection
+from django.dispatch import Signal
+from django.test import Client
+
+from TapVet import metrics
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+class TestMetrics:
+
+    def test_model_init_signals_are_not_timed(self):
+        metrics.install()
+        signal = Signal()
+        metrics._local.spans, metrics._local.open_spans = {}, set()
+        try:
+            User(username='untimed')
+            signal.send(sender=None)
+            assert 'signals' not in metrics.current()
+            signal.connect(lambda sender, **kwargs: None, weak=False)
+            signal.send(sender=None)
+            assert 'signals' in metrics.current()
+        finally:
+            metrics._local.spans = None
+
+    def test_unknown_methods_share_a_histogram(self):
+        metrics.histograms.clear()
+        client = Client()
+        for method in ('FOO', 'BAR'):
+            client.generic(method, '/api/v1/users/groups/')
+        assert list(metrics.histograms) == [
+            ('users.views.GroupsListView', 'other')
+        ]
+        assert metrics.histograms[
+            ('users.views.GroupsListView', 'other')
+        ]['count'] == 2
+
+    def test_queries_are_counted_without_debug_cursor(self):
+        metrics.histograms.clear()
+        resp = Client().get('/api/v1/users/groups/')
+        assert not connection.force_debug_cursor
+        histogram = metrics.histograms[
+            ('users.views.GroupsListView', 'GET')
+        ]
+        assert histogram['queries'] >= 1
+        assert 'desc="%s queries"' % histogram['queries'] in \
+            resp['Server-Timing']
@@ -0,0 +1,74 @@
+"""Testing the push notification dispatcher"""
+import pytest
+from django.test.utils import override_settings
+from django.utils.six.moves.urllib.error import URLError
+from mixer.backend.django import mixer
+from push_notifications import NotificationError
+from push_notifications.models import APNSDevice, GCMDevice
+
+from helpers.tests_helpers import CustomTestCase
+from TapVet import notifications
+
+pytestmark = pytest.mark.django_db
+
+
+class TestNotifications(CustomTestCase):
+
+    def fake_send(self, monkeypatch, errors=()):
+        """
+        Record the multicast calls instead of sending them, raising the
+        given errors on the first calls.
+        """
+        sent = []
+        errors = list(errors)
+
+        def send_message(devices, message, **kwargs):
+            sent.append((
+                devices.model, message,
+                sorted(devices.values_list('user_id', flat=True))
+            ))
+            if errors:
+                raise errors.pop(0)
+        for model in (GCMDevice, APNSDevice):
+            monkeypatch.setattr(
+                type(model.objects.all()), 'send_message', send_message
+            )
+        return sent
+
+    def test_flush_batches_by_message(self, monkeypatch):
+        sent = self.fake_send(monkeypatch)
+        self.load_users_data()
+        users = [self.get_user(groups_id=1) for _ in range(3)]
+        for user in users:
+            mixer.blend(GCMDevice, user=user, active=True)
+        notifications.pending.items.clear()
+        for user, message in zip(users, ['liked', 'liked', 'commented']):
+            notifications.pending.append(
+                {'user_id': user.id, 'message': message}
+            )
+        assert notifications.flush() == 3
+        assert sorted(sent) == sorted([
+            (GCMDevice, 'liked', sorted([users[0].id, users[1].id])),
+            (GCMDevice, 'commented', [users[2].id]),
+        ])
+        assert notifications.flush() == 0
+
+    def test_retry_until_max_attempts(self, monkeypatch):
+        sent = self.fake_send(
+            monkeypatch, [NotificationError('down')] * 5
+        )
+        user = self.load_users_data().get_user(groups_id=1)
+        mixer.blend(GCMDevice, user=user, active=True)
+        with override_settings(NOTIFICATIONS_MAX_ATTEMPTS=3):
+            notifications.send([{'user_id': user.id, 'message': 'liked'}])
+        assert len(sent) == 3
+
+    def test_retry_after_url_error(self, monkeypatch):
+        sent = self.fake_send(monkeypatch, [URLError('timeout')])
+        user = self.load_users_data().get_user(groups_id=1)
+        mixer.blend(APNSDevice, user=user, active=True)
+        notifications.send([{'user_id': user.id, 'message': 'liked'}])
+        assert sent == [
+            (APNSDevice, 'liked', [user.id]),
+            (APNSDevice, 'liked', [user.id]),
+        ]
@@ -0,0 +1,54 @@
+"""Testing the background job queue"""
+import json
+import threading
+
+from django.conf import settings
+
+from activities.management.commands.run_worker import Command as RunWorker
+from TapVet import queue
+from TapVet.images import IMAGES_QUEUE
+from TapVet.notifications import NOTIFICATIONS_QUEUE
+from users.tasks import MAILS_QUEUE
+
+ran = []
+done = threading.Event()
+
+
+def record(value):
+    ran.append(value)
+    done.set()
+
+
+class TestQueue:
+
+    def test_worker_consumes_every_queue_by_default(self):
+        options = RunWorker().create_parser(
+            'manage.py', 'run_worker'
+        ).parse_args([])
+        assert options.queues == list(settings.QUEUE_NAMES)
+        for name in (
+            queue.DEFAULT_QUEUE, NOTIFICATIONS_QUEUE, MAILS_QUEUE,
+            IMAGES_QUEUE
+        ):
+            assert name in settings.QUEUE_NAMES
+
+    def test_delayed_push(self):
+        del ran[:]
+        done.clear()
+        job = json.dumps({
+            'task': 'TapVet.tests.test_queue.record',
+            'args': ['later'],
+            'kwargs': {}
+        })
+        queue.deliver('tests', job, delay=0.2)
+        assert ran == []
+        assert done.wait(5)
+        assert ran == ['later']
+
+    def test_buffer_takes_oldest_items(self):
+        buffer = queue.Buffer('tests')
+        for item in range(5):
+            buffer.append(item)
+        assert buffer.take(3) == [0, 1, 2]
+        assert buffer.take(3) == [3, 4]
+        assert buffer.take(3) == []
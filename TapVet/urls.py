@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.conf import settings
 
 from posts.views import PaymentAmountDetail
+from TapVet.reference import BootstrapView
+from TapVet.renditions import RenditionView
 
 urlpatterns = [
     # DASHBOARD
@@ -59,6 +61,13 @@ urlpatterns = [
         r'^api/v1/configurations/prices/(?P<pk>[0-9]+)/$',
         PaymentAmountDetail.as_view()
     ),
+    url(r'^api/v1/bootstrap/$', BootstrapView.as_view()),
+    url(
+        r'^api/v1/images/(?P<kind>posts|profiles)/(?P<pk>[0-9]+)/'
+        r'(?P<version>[0-9a-f]{16})/$',
+        RenditionView.as_view(),
+        name='renditions'
+    ),
     url(r'^docs/', include('rest_framework_docs.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
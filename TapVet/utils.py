@@ -1,8 +1,6 @@
-from urllib2 import URLError
-from ssl import SSLError
-
 from push_notifications.models import GCMDevice, APNSDevice
-from push_notifications import NotificationError
+
+from . import notifications
 
 
 def get_user_devices(user_id):
@@ -12,12 +10,8 @@ def get_user_devices(user_id):
 
 
 def send_notification_message(user_id, message):
-    gcm_device, apns_device = get_user_devices(user_id)
-
-    try:
-        if gcm_device:
-            gcm_device.send_message(message)
-        if apns_device:
-            apns_device.send_message(message)
-    except (NotificationError, URLError, SSLError):
-        pass
+    """
+    Queue a push notification for the devices of the user, see
+    TapVet.notifications.
+    """
+    notifications.enqueue(user_id, message)
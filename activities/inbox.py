@@ -0,0 +1,111 @@
+"""
+Per user activity inbox.
+
+The signals that save an Activity hand it to `deliver`, which writes it to
+the inbox of the user it concerns: the owner of the liked or commented
+post, or of the upvoted comment. The comments are also delivered to the
+users that liked the post before, that fan-out runs in background since a
+post can have many likes.
+"""
+from TapVet import queue
+
+from .models import Activity, InboxItem
+
+LIKE_COMMENT = 'like_comment'
+
+
+def direct_recipient(activity):
+    if activity.action in (Activity.LIKE, Activity.COMMENT):
+        recipient = activity.post.user
+    elif activity.action == Activity.UPVOTE:
+        recipient = activity.comment.user
+        # Vets only hear about the upvotes of other vets
+        if recipient.is_vet() and not activity.user.is_vet():
+            return None
+    else:
+        return None
+    if recipient.id == activity.user_id:
+        return None
+    return recipient.id
+
+
+def deliver(activity, background=True):
+    """
+    Write `activity` to the inboxes of its recipients, or withdraw it when
+    the activity is no longer active.
+    """
+    if not activity.active:
+        InboxItem.objects.filter(activity=activity).delete()
+        if activity.action == Activity.LIKE:
+            # The comments after the like go away with the like
+            InboxItem.objects.filter(
+                recipient_id=activity.user_id,
+                activity__post_id=activity.post_id,
+                beacon=LIKE_COMMENT
+            ).delete()
+        return
+    recipient_id = direct_recipient(activity)
+    if recipient_id is not None:
+        InboxItem.objects.update_or_create(
+            recipient_id=recipient_id,
+            activity=activity,
+            defaults={
+                'beacon': activity.action,
+                'created_at': activity.updated_at
+            }
+        )
+    if activity.action == Activity.COMMENT:
+        if background:
+            queue.enqueue('activities.inbox.fan_out_comment', activity.id)
+        else:
+            fan_out_comment(activity.id)
+
+
+def fan_out_comment(activity_id):
+    """
+    Deliver a comment to the users that liked the post before it was made.
+    """
+    from posts.models import UserLikesPost
+
+    activity = Activity.objects.select_related('post').filter(
+        pk=activity_id,
+        active=True
+    ).first()
+    if activity is None:
+        return 0
+    likers = UserLikesPost.objects.filter(
+        post_id=activity.post_id,
+        created_at__lt=activity.updated_at
+    ).exclude(
+        user_id__in=[activity.user_id, activity.post.user_id]
+    ).exclude(
+        user_id__in=InboxItem.objects.filter(
+            activity=activity
+        ).values('recipient_id')
+    ).values_list('user_id', flat=True)
+    items = [
+        InboxItem(
+            recipient_id=user_id,
+            activity=activity,
+            beacon=LIKE_COMMENT,
+            created_at=activity.updated_at
+        ) for user_id in likers
+    ]
+    InboxItem.objects.bulk_create(items, batch_size=500)
+    return len(items)
+
+
+def rebuild():
+    """
+    Deliver again every active activity, used to fill the inboxes with the
+    activity saved before they existed.
+    """
+    InboxItem.objects.all().delete()
+    activities = Activity.objects.filter(active=True).exclude(
+        action=Activity.FOLLOW
+    ).select_related('user', 'post__user', 'comment__user')
+    count = 0
+    for activity in activities.iterator():
+        deliver(activity, background=False)
+        count += 1
+    return count
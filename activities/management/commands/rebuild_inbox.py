@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from activities import inbox
+
+
+class Command(BaseCommand):
+    help = 'Fill the activity inboxes again from the Activity rows'
+
+    def handle(self, *args, **options):
+        count = inbox.rebuild()
+        self.stdout.write('Delivered %s activities' % count)
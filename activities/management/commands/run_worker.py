@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from TapVet import queue
+
+
+class Command(BaseCommand):
+    help = 'Run the background jobs pushed on the Redis queues'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queues',
+            nargs='*',
+            default=list(settings.QUEUE_NAMES),
+            help='Queues to consume, in priority order, QUEUE_NAMES by '
+                 'default'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queues are empty'
+        )
+
+    def handle(self, *args, **options):
+        done = queue.work(options['queues'], burst=options['burst'])
+        self.stdout.write('Ran %s jobs' % done)
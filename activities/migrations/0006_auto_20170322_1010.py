@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-22 10:10
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0005_inboxitem'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='activity',
+            index_together=set([('user', 'action', 'active', 'updated_at'), ('post', 'action', 'active')]),
+        ),
+    ]
@@ -29,6 +29,10 @@ class Activity(models.Model):
     class Meta:
         verbose_name = "Activity"
         verbose_name_plural = "Activities"
+        index_together = (
+            ('user', 'action', 'active', 'updated_at'),
+            ('post', 'action', 'active'),
+        )
 
     def __unicode__(self):
         return u'user: %s //action: %s' % (
@@ -61,3 +65,24 @@ class Activity(models.Model):
                     "The user followed is needed."
                 )
         super(Activity, self).save(*args, **kwargs)
+
+
+class InboxItem(models.Model):
+    """
+    Activity delivered to a user. The rows are written by the signals when
+    the activity happens, so the activity list of a user is read from a
+    single index range.
+    """
+    recipient = models.ForeignKey('users.User', related_name='inbox')
+    activity = models.ForeignKey(Activity, related_name='deliveries')
+    beacon = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('recipient', 'activity')
+        index_together = (('recipient', 'created_at'),)
+
+    def __unicode__(self):
+        return u'recipient: %s //beacon: %s' % (
+            self.recipient_id, self.beacon
+        )
@@ -0,0 +1,72 @@
+"""Testing Views"""
+import pytest
+
+from django.core.management import call_command
+from rest_framework.test import force_authenticate
+
+from mixer.backend.django import mixer
+
+from posts.models import Post, UserLikesPost
+from .. import views
+from ..models import InboxItem
+
+from helpers.tests_helpers import CustomTestCase
+
+pytestmark = pytest.mark.django_db
+
+
+class TestActivityListView(CustomTestCase):
+
+    def get_beacons(self, user):
+        req = self.factory.get('/')
+        force_authenticate(req, user=user)
+        resp = views.ActivityListView.as_view()(req)
+        assert resp.status_code == 200, 'Should return OK (200)'
+        return [
+            (activity['beacon'], activity['post']['id'])
+            for activity in resp.data['results']
+        ]
+
+    def test_activity_on_own_posts(self):
+        owner = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        post = mixer.blend(Post, user=owner)
+        UserLikesPost.objects.create(user=other, post=post)
+        mixer.blend('comments.Comment', user=other, post=post)
+        mixer.blend('comments.Comment', user=owner, post=post)
+        assert self.get_beacons(owner) == [
+            ('comment', post.id), ('like', post.id)
+        ]
+
+    def test_comments_after_like(self):
+        owner = self.load_users_data().get_user(groups_id=1)
+        liker = self.get_user(groups_id=1)
+        other = self.get_user(groups_id=2)
+        post = mixer.blend(Post, user=owner)
+        mixer.blend('comments.Comment', user=other, post=post)
+        UserLikesPost.objects.create(user=liker, post=post)
+        assert self.get_beacons(liker) == []
+        mixer.blend('comments.Comment', user=other, post=post)
+        assert self.get_beacons(liker) == [('like_comment', post.id)]
+
+    def test_unlike_withdraws_activity(self):
+        owner = self.load_users_data().get_user(groups_id=1)
+        liker = self.get_user(groups_id=1)
+        post = mixer.blend(Post, user=owner)
+        like = UserLikesPost.objects.create(user=liker, post=post)
+        mixer.blend('comments.Comment', user=owner, post=post)
+        assert self.get_beacons(liker) == [('like_comment', post.id)]
+        like.delete()
+        assert self.get_beacons(owner) == []
+        assert self.get_beacons(liker) == []
+
+    def test_rebuild_inbox(self):
+        owner = self.load_users_data().get_user(groups_id=1)
+        liker = self.get_user(groups_id=1)
+        post = mixer.blend(Post, user=owner)
+        UserLikesPost.objects.create(user=liker, post=post)
+        mixer.blend('comments.Comment', user=liker, post=post)
+        before = self.get_beacons(owner)
+        InboxItem.objects.all().delete()
+        call_command('rebuild_inbox', verbosity=0)
+        assert self.get_beacons(owner) == before
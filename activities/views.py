@@ -1,13 +1,10 @@
-from itertools import chain
-
-from django.db.models import Value, CharField
+from django.db.models import Value, CharField, F
 
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated
 
-from TapVet.pagination import StandardPagination
+from TapVet.pagination import KeysetPagination
 from users.models import User
-from posts.models import UserLikesPost
 
 from .models import Activity
 from .serializers import ActivitySerializer
@@ -27,7 +24,7 @@ class UserLikedPostListView(ListAPIView):
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     permission_classes = (IsAuthenticated,)
-    pagination_class = StandardPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
 
@@ -53,7 +50,7 @@ class UserCommentPostListView(ListAPIView):
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     permission_classes = (IsAuthenticated,)
-    pagination_class = StandardPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         qs = self.queryset
@@ -83,100 +80,24 @@ class UserCommentPostListView(ListAPIView):
 
 
 class ActivityListView(ListAPIView):
+    """
+    Activity of other users on the posts and comments of the user, and the
+    comments left on the posts they liked after their like, read from the
+    inbox of the user.
+    """
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     permission_classes = (IsAuthenticated,)
-    pagination_class = StandardPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        user = self.request.user
-
-        qs1 = self.helper(
-            Activity.objects.filter(
-                post__user=user,
-                action=Activity.LIKE,
-                active=True
-            ).annotate(
-                beacon=Value(
-                    'like',
-                    output_field=CharField()
-                )
-            ),
-            user
-        )
-        # Verify user is vet
-        qs2_params = {
-            'comment__user': user,
-            'action': Activity.UPVOTE,
-            'active': True
-        }
-        if user.is_vet():
-            qs2_params['user__groups__pk__in'] = User.IS_VET
-
-        qs2 = self.helper(
-            Activity.objects.filter(
-                **qs2_params
-            ).annotate(
-                beacon=Value(
-                    'upvote',
-                    output_field=CharField()
-                )
-            ),
-            user
-        )
-
-        qs3 = self.helper(
-            Activity.objects.filter(
-                post__user=user,
-                action=Activity.COMMENT,
-                active=True
-            ).annotate(
-                beacon=Value(
-                    'comment', output_field=CharField()
-                )
-            ),
-            user
-        )
-
-        qs4 = list(
-            self.helper(
-                Activity.objects.filter(
-                    post__in=user.likes.all(),
-                    action=Activity.COMMENT,
-                    active=True
-                ).exclude(post__user=user).annotate(
-                    beacon=Value(
-                        'like_comment',
-                        output_field=CharField()
-                    )
-                ),
-                user
-            )
-        )
-        user_likes = list(
-            UserLikesPost.objects.filter(
-                post_id__in=[activity.post.id for activity in qs4],
-                user=user
-            ).select_related('post')
-        )
-        qs5 = []
-        for activity in qs4:
-            for like in user_likes:
-                if like.post.id == activity.post.id:
-                    if activity.updated_at > like.created_at:
-                        # Only append the new ones after the like
-                        qs5.append(activity)
-
-        return sorted(
-            chain(qs1, qs2, qs3, qs5),
-            key=lambda instance: instance.updated_at,
-            reverse=True
-        )
-
-    @staticmethod
-    def helper(qs, user):
-        return qs.exclude(user=user).select_related(
+        return self.queryset.filter(
+            deliveries__recipient=self.request.user
+        ).annotate(
+            beacon=F('deliveries__beacon'),
+            delivered_at=F('deliveries__created_at')
+        ).select_related(
             *select_tuples
         ).prefetch_related(
             'post__images',
-        )
+        ).order_by('-delivered_at', '-id')
@@ -1,5 +1,7 @@
 from django.db import models
 
+from TapVet import reference
+
 
 class AppText(models.Model):
     key = models.CharField(max_length=100)
@@ -10,3 +12,7 @@ class AppText(models.Model):
 
     def __unicode__(self):
         return u'%s' % (self.key)
+
+
+# Reference data, cached until one of them is written
+reference.watch(AppText)
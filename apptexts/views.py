@@ -1,11 +1,14 @@
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import AllowAny
 
+from TapVet.reference import ReferenceListMixin
+
 from .serializers import AppTextSerializer
 from .models import AppText
 
 
-class AppTextView(ListAPIView):
+class AppTextView(ReferenceListMixin, ListAPIView):
     serializer_class = AppTextSerializer
     permission_classes = (AllowAny,)
     queryset = AppText.objects.all()
+    reference_key = 'app_texts'
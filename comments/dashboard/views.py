@@ -1,4 +1,3 @@
-from django.db.models import Count
 from django.http import Http404
 
 from rest_framework.generics import (
@@ -21,14 +20,12 @@ class PetOwnerCommentsView(ListAPIView):
     serializer_class = CommentSerializer
     permission_classes = (permissions.IsAdminUser,)
     pagination_class = StandardPagination
-    groups_ids = [1, 2]
+    audience = Comment.OWNER
 
     def get_queryset(self):
         qs = Comment.objects.filter(
             post_id=self.kwargs['pk'],
-            user__groups_id__in=self.groups_ids
-        ).annotate(
-            upvoters_count=Count('upvoters')
+            author_audience=self.audience
         ).select_related(
             'user__groups'
         ).order_by('-upvoters_count', '-updated_at')
@@ -37,7 +34,7 @@ class PetOwnerCommentsView(ListAPIView):
 
 class VetCommentsView(PetOwnerCommentsView):
     serializer_class = CommentVetSerializer
-    groups_ids = [3, 4, 5]
+    audience = Comment.VET
 
 
 class AdminCommentDetailView(DestroyAPIView):
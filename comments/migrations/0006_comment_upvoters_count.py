@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-10 14:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0005_auto_20161219_2041'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='upvoters_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
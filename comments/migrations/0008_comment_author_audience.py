@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-23 11:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0007_auto_20170322_1010'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='author_audience',
+            field=models.CharField(choices=[('vet', 'Veterinarian'), ('owner', 'Pet owner')], default='owner', max_length=5),
+        ),
+        migrations.AlterIndexTogether(
+            name='comment',
+            index_together=set([('post', 'author_audience', 'updated_at')]),
+        ),
+    ]
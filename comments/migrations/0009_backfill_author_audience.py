@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-23 11:40
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+VET_GROUPS = [3, 4, 5]
+BATCH_SIZE = 500
+
+
+def set_author_audience(apps, schema_editor):
+    """Every comment was added as a pet owner one, mark the vet ones."""
+    User = apps.get_model('users', 'User')
+    Comment = apps.get_model('comments', 'Comment')
+    vets = list(User.objects.filter(
+        groups_id__in=VET_GROUPS
+    ).values_list('id', flat=True))
+    for start in range(0, len(vets), BATCH_SIZE):
+        Comment.objects.filter(
+            user_id__in=vets[start:start + BATCH_SIZE]
+        ).update(author_audience='vet')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_profileimage_original_cas'),
+        ('comments', '0008_comment_author_audience'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            set_author_audience, migrations.RunPython.noop
+        ),
+    ]
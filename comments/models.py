@@ -5,19 +5,46 @@ from .signals import new_comment_signal, upvoters_changed
 
 
 class Comment(models.Model):
+    VET = 'vet'
+    OWNER = 'owner'
+
+    AUDIENCE_CHOICES = (
+        (VET, 'Veterinarian'),
+        (OWNER, 'Pet owner'),
+    )
+
     description = models.CharField(max_length=1200)
 
     user = models.ForeignKey('users.User', related_name='comments')
     post = models.ForeignKey('posts.Post', related_name='comments')
+    # Copy of the group of the author, set on creation, so the vet and pet
+    # owner comments of a post are listed without joining the users
+    author_audience = models.CharField(
+        choices=AUDIENCE_CHOICES, max_length=5, default=OWNER
+    )
     upvoters = models.ManyToManyField(
         'users.User', related_name='upvotes', blank=True)
+    # Kept up to date by the upvoters m2m_changed signal
+    upvoters_count = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        index_together = (('post', 'author_audience', 'updated_at'),)
+
     def __unicode__(self):
         return u'comment: %s - created: %s' % (self.id, self.created_at)
 
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            self.author_audience = self.audience_of(self.user)
+        super(Comment, self).save(*args, **kwargs)
+
+    @classmethod
+    def audience_of(cls, user):
+        return cls.VET if user.is_vet() else cls.OWNER
+
 
 # Func to connect the signal on post save.
 post_save.connect(
@@ -1,4 +1,8 @@
+from django.db.models import F
+
 from TapVet.utils import send_notification_message
+from posts import feed
+from activities import inbox
 from activities.models import Activity
 from TapVet.messages import (
     commenting_post, upvoting_comment, vet_commenting_post
@@ -24,24 +28,51 @@ def new_comment_signal(sender, instance=None, created=False, **kwargs):
             comment=instance
         )
         activity.save()
+        inbox.deliver(activity)
+        feed.post_commented(user.id, post.id)
+
+
+def update_upvoters_count(instance, action, pk_set):
+    '''
+    Keep Comment.upvoters_count in sync with atomic updates. The pk_set of
+    a removal holds every id asked for, so the rows really removed are
+    counted before.
+    '''
+    comments = instance.__class__.objects.filter(pk=instance.pk)
+    if action == 'pre_remove':
+        instance._removed_upvoters = instance.upvoters.filter(
+            pk__in=pk_set
+        ).count()
+    elif action == 'post_add':
+        comments.update(upvoters_count=F('upvoters_count') + len(pk_set))
+    elif action == 'post_remove':
+        removed = getattr(instance, '_removed_upvoters', 0)
+        if removed:
+            comments.update(upvoters_count=F('upvoters_count') - removed)
+    elif action == 'post_clear':
+        comments.update(upvoters_count=0)
 
 
 def upvoters_changed(instance, action=None, pk_set=None, **kwargs):
+    if not kwargs.get('reverse', False):
+        update_upvoters_count(instance, action, pk_set or set())
     if action == 'post_add' and pk_set:
         if instance.user.comments_like_notification:
             send_notification_message(instance.user.id, upvoting_comment)
-        Activity.objects.update_or_create(
+        activity, _ = Activity.objects.update_or_create(
             user_id=pk_set.pop(),
             action=Activity.UPVOTE,
             comment=instance,
             post=instance.post,
             defaults={'active': True}
         )
+        inbox.deliver(activity)
     elif action == 'post_remove' and pk_set:
-        Activity.objects.update_or_create(
+        activity, _ = Activity.objects.update_or_create(
             user_id=pk_set.pop(),
             action=Activity.UPVOTE,
             comment=instance,
             post=instance.post,
             defaults={'active': False}
         )
+        inbox.deliver(activity)
@@ -42,3 +42,23 @@ class TestFeedbackModel(CustomTestCase):
             assert str(e) == (
                 'Error: The user has to be the same that the post owner'
             )
+
+
+class TestCommentModel(CustomTestCase):
+
+    def test_author_audience(self):
+        owner = self.load_users_data().get_user(groups_id=2)
+        vet = self.get_user(groups_id=4)
+        post = mixer.blend('posts.post', user=owner)
+        comment = mixer.blend(
+            'comments.comment', post=post, user=vet,
+            author_audience=models.Comment.OWNER
+        )
+        assert comment.author_audience == models.Comment.VET
+        comment = mixer.blend('comments.comment', post=post, user=owner)
+        assert comment.author_audience == models.Comment.OWNER
+        comment.user = vet
+        comment.save()
+        assert models.Comment.objects.get(
+            pk=comment.pk
+        ).author_audience == models.Comment.OWNER
@@ -9,7 +9,7 @@ from rest_framework.views import APIView
 from rest_framework import permissions, status
 from rest_framework.response import Response
 
-from TapVet.pagination import StandardPagination
+from TapVet.pagination import StandardPagination, KeysetPagination
 from TapVet import messages
 from posts.models import Post
 
@@ -33,11 +33,11 @@ class CommentsPetOwnerListCreateView(ListCreateAPIView):
     """
     serializer_class = CommentSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
-    pagination_class = StandardPagination
-    groups_ids = [1, 2]
+    pagination_class = KeysetPagination
+    audience = Comment.OWNER
 
     def get_queryset(self):
-        annotate_params = {'upvoters_count': Count('upvoters')}
+        annotate_params = {}
         user = self.request.user
         if user.is_authenticated():
             annotate_params['upvoted'] = Case(
@@ -66,7 +66,7 @@ class CommentsPetOwnerListCreateView(ListCreateAPIView):
                     )
         qs = Comment.objects.filter(
             post_id=self.kwargs['pk'],
-            user__groups_id__in=self.groups_ids
+            author_audience=self.audience
         ).annotate(
             **annotate_params
         ).select_related(
@@ -119,7 +119,7 @@ class CommentsVetListCreateView(CommentsPetOwnerListCreateView):
     POST
     """
     serializer_class = CommentVetNamelessSerializer
-    groups_ids = [3, 4, 5]
+    audience = Comment.VET
 
     def get(self, request, *args, **kwargs):
         if request.user.is_authenticated() and request.user.is_vet():
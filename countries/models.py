@@ -2,6 +2,8 @@ from __future__ import unicode_literals
 
 from django.db import models
 
+from TapVet import reference
+
 
 class Country(models.Model):
     name = models.CharField(max_length=50)
@@ -25,3 +27,8 @@ class State(models.Model):
 
     def __unicode__(self):
         return self.name
+
+
+# Reference data, cached until one of them is written
+reference.watch(Country)
+reference.watch(State)
@@ -2,11 +2,13 @@ from rest_framework import permissions
 from rest_framework.generics import ListAPIView
 from django.db.models.query import QuerySet
 
+from TapVet.reference import ReferenceListMixin
+
 from .models import State, Country
 from .serializers import StateSerializer, CountriesSerializer
 
 
-class StateListView(ListAPIView):
+class StateListView(ReferenceListMixin, ListAPIView):
     queryset = State.objects.all()
     serializer_class = StateSerializer
     permission_classes = (permissions.AllowAny,)
@@ -16,11 +18,16 @@ class StateListView(ListAPIView):
             if isinstance(queryset, QuerySet):
                 # Ensure queryset is re-evaluated on each request.
                 queryset = queryset.all()
-            queryset = queryset.filter(country=self.kwargs['pk'])
+            if 'pk' in self.kwargs:
+                queryset = queryset.filter(country=self.kwargs['pk'])
             return queryset
 
+    def get_reference_key(self):
+        return 'states:%s' % self.kwargs.get('pk', 'all')
+
 
-class CountryListView(ListAPIView):
+class CountryListView(ReferenceListMixin, ListAPIView):
     queryset = Country.objects.all()
     serializer_class = CountriesSerializer
     permission_classes = (permissions.AllowAny,)
+    reference_key = 'countries'
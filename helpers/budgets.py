@@ -0,0 +1,188 @@
+"""
+Query count and latency budgets of the API endpoints.
+
+pytest plugin, loaded by the root conftest. The endpoints and their budgets
+are declared in helpers/budgets.json: the URL, with `{name}` placeholders
+filled from the seeded data, the user making the request, the maximum
+number of queries and the maximum time in milliseconds.
+
+Each endpoint is requested after seeding the database at every size of
+`sizes`. The number of queries must not change with the size, an N+1
+shows up as queries that grow, and the report at the end of the run lists
+them for every endpoint.
+
+The time budgets depend on the machine, they are only checked with the
+--budget-timings option.
+"""
+import json
+import os
+import re
+import time
+from collections import Counter, namedtuple
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from rest_framework.test import APIClient
+
+from .tests_helpers import CustomTestCase
+
+BUDGETS_FILE = os.path.join(os.path.dirname(__file__), 'budgets.json')
+
+Measurement = namedtuple('Measurement', ('size', 'queries', 'milliseconds'))
+
+LITERALS = re.compile(r"'[^']*'|\b\d+(\.\d+)?\b")
+IN_LISTS = re.compile(r'IN \([^)]*\)')
+
+results = []
+
+
+def load_budgets(path=BUDGETS_FILE):
+    with open(path) as budgets_file:
+        return json.load(budgets_file)
+
+
+def normalize(sql):
+    """SQL of a query without its literals, to count repeated queries."""
+    return IN_LISTS.sub('IN (...)', LITERALS.sub('?', sql))
+
+
+def grown(small, large):
+    """(sql, count at the small size, count at the large one) of growth."""
+    before = Counter(normalize(query['sql']) for query in small.queries)
+    after = Counter(normalize(query['sql']) for query in large.queries)
+    return [
+        (sql, before[sql], count)
+        for sql, count in after.items()
+        if count > before[sql]
+    ]
+
+
+class Dataset(CustomTestCase):
+    """
+    Posts, comments, likes and follows grown in steps. Every author gets a
+    post liked by the owner, who follows them, and commented by a vet and
+    the owner; the first post also gets a vet and an owner comment per
+    step, for the comment lists.
+    """
+
+    def __init__(self):
+        self.load_users_data().load_feed_variables()
+        self.size = 0
+        self.owner = self.get_user(groups_id=1)
+        self.vet = self.get_user(groups_id=3)
+        country = mixer.blend('countries.Country')
+        mixer.blend(
+            'users.Veterinarian', user=self.vet, veterinarian_type='3',
+            verified=True, country=country,
+            state=mixer.blend('countries.State', country=country)
+        )
+        self.post = None
+
+    def grow(self, size):
+        for _ in range(size - self.size):
+            author = self.get_user(groups_id=1)
+            self.owner.follows.add(author)
+            author.follows.add(self.owner)
+            post = mixer.blend('posts.Post', user=author)
+            self.post = self.post or post
+            mixer.blend('posts.UserLikesPost', user=self.owner, post=post)
+            for user in (self.vet, self.owner):
+                mixer.blend('comments.Comment', post=post, user=user)
+                mixer.blend('comments.Comment', post=self.post, user=user)
+        self.size = max(size, self.size)
+
+    def context(self):
+        return {
+            'owner': self.owner.id,
+            'vet': self.vet.id,
+            'post': self.post.id,
+        }
+
+
+def measure(budget, dataset):
+    client = APIClient()
+    if budget.get('user'):
+        client.force_authenticate(getattr(dataset, budget['user']))
+    url = budget['url'].format(**dataset.context())
+    with CaptureQueriesContext(connection) as queries:
+        start = time.time()
+        response = client.get(url)
+        milliseconds = (time.time() - start) * 1000
+    assert response.status_code == 200, (url, response.status_code)
+    return Measurement(dataset.size, queries.captured_queries, milliseconds)
+
+
+class Budget(object):
+    def __init__(self, name, budget, sizes, timings=False):
+        self.name = name
+        self.budget = budget
+        self.sizes = sorted(sizes)
+        self.timings = timings
+        self.measurements = []
+
+    def run(self):
+        dataset = Dataset()
+        for size in self.sizes:
+            dataset.grow(size)
+            self.measurements.append(measure(self.budget, dataset))
+        results.append(self)
+        return self
+
+    def growth(self):
+        return grown(self.measurements[0], self.measurements[-1])
+
+    def check(self):
+        large = self.measurements[-1]
+        assert not self.growth(), self.describe()
+        assert len(large.queries) <= self.budget['max_queries'], \
+            self.describe()
+        if self.timings:
+            assert large.milliseconds <= self.budget['max_ms'], \
+                self.describe()
+
+    def describe(self):
+        lines = ['%s: %s' % (self.name, ', '.join(
+            '%s queries and %.0fms at size %s' % (
+                len(measurement.queries), measurement.milliseconds,
+                measurement.size
+            ) for measurement in self.measurements
+        ))]
+        for sql, before, after in self.growth():
+            lines.append('    %s -> %s  %s' % (before, after, sql))
+        return '\n'.join(lines)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--budget-timings', action='store_true',
+        help='Also check the time budgets of helpers/budgets.json'
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'budget: request an endpoint against its budget'
+    )
+
+
+@pytest.fixture
+def budget(request):
+    """Runs the budget of an endpoint of budgets.json by name."""
+    budgets = load_budgets()
+    timings = request.config.getoption('budget_timings')
+
+    def run(name):
+        return Budget(
+            name, budgets['endpoints'][name], budgets['sizes'], timings
+        ).run()
+    return run
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not results:
+        return
+    terminalreporter.write_sep('=', 'endpoint budgets')
+    for result in results:
+        terminalreporter.write_line(result.describe())
@@ -2,6 +2,8 @@ import stripe
 
 from stripe.error import APIConnectionError, InvalidRequestError, CardError
 
+from TapVet import metrics
+
 
 def stripe_errors_handler(error):
     """Method to search the exactly string of the error message
@@ -26,7 +28,8 @@ def get_customer_in_stripe(instance):
     """
     if instance.stripe_token:
         try:
-            customer = stripe.Customer.retrieve(instance.stripe_token)
+            with metrics.timed('external'):
+                customer = stripe.Customer.retrieve(instance.stripe_token)
         except (APIConnectionError, InvalidRequestError, CardError) as err:
             error = stripe_errors_handler(err)
         else:
@@ -0,0 +1,12 @@
+"""Endpoint budgets, see helpers/budgets.json"""
+import pytest
+
+from helpers.budgets import load_budgets
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.budget
+@pytest.mark.parametrize('name', sorted(load_budgets()['endpoints']))
+def test_endpoint_budget(budget, name):
+    budget(name).check()
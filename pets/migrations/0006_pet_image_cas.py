@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-15 09:47
+from __future__ import unicode_literals
+
+import TapVet.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0005_auto_20170202_1758'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pet',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to=TapVet.images.ContentAddressedPath('image')),
+        ),
+    ]
@@ -2,6 +2,8 @@ from __future__ import unicode_literals
 from django.db import models
 from django.utils.timezone import now
 
+from TapVet import images, reference
+
 PET_GENDER = (
     ('male', 'Male'),
     ('female', 'Female')
@@ -38,10 +40,16 @@ class PetType(models.Model):
         return u'%s' % self.name
 
 
+# Reference data, cached until one of them is written
+reference.watch(PetType)
+
+
 class Pet(models.Model):
     name = models.CharField(max_length=50)
     fixed = models.NullBooleanField(null=True, blank=True, default=None)
-    image = models.ImageField(null=True, blank=True, upload_to=uploads_path)
+    image = models.ImageField(
+        null=True, blank=True, upload_to=images.ContentAddressedPath('image')
+    )
     birth_year = models.IntegerField()  # We just need the year
     pet_type = models.ForeignKey(PetType)
     breed = models.CharField(max_length=150, null=True, blank=True)
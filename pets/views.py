@@ -14,6 +14,7 @@ from users.models import User
 from .models import Pet, PetType
 from .serializers import PetSerializer, PetTypeSerializer
 from TapVet.permissions import IsOwnerOrReadOnly
+from TapVet.reference import ReferenceListMixin
 
 
 class PetCreateView(CreateAPIView):
@@ -89,7 +90,8 @@ class PetListByUser(ListAPIView):
         return queryset
 
 
-class PetTypeListView(ListAPIView):
+class PetTypeListView(ReferenceListMixin, ListAPIView):
     serializer_class = PetTypeSerializer
     permission_classes = (permissions.IsAuthenticated,)
     queryset = PetType.objects.all()
+    reference_key = 'pet_types'
@@ -0,0 +1,298 @@
+"""
+Materialized feed store.
+
+Every user keeps one FeedEntry row per post they have an affinity with
+(liked it, commented it, follow its author or wrote it). The rows are kept
+up to date by the like, comment, follow and post creation signals, so the
+feed page does not need to compute the affinity of every active post on
+each request.
+
+How the entries and the posts without any affinity are mixed into a page
+is up to the ranking engine, see posts.ranking.
+
+Models are imported inside the functions because this module is imported
+by the signal modules, which are imported by the models themselves.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, When, Value, IntegerField, FloatField, F, Q
+)
+
+from TapVet import queue
+from users import graph
+
+from .ranking import get_weights, get_engine
+
+FLAGS = ('liked', 'commented', 'follows_author', 'own')
+
+VET_AUDIENCE = {'visible_by_vet': True, 'visible_by_owner': False}
+OWNER_AUDIENCE = {'visible_by_owner': True}
+
+
+def audience_filters(is_vet):
+    return dict(VET_AUDIENCE if is_vet else OWNER_AUDIENCE, active=True)
+
+
+def entry_points(entry, weights):
+    return sum(
+        getattr(weights, flag) for flag in FLAGS if getattr(entry, flag)
+    )
+
+
+def points_expression(weights):
+    return sum(
+        (
+            Case(
+                When(**{flag: True, 'then': Value(getattr(weights, flag))}),
+                default=Value(0),
+                output_field=IntegerField()
+            ) for flag in FLAGS
+        ),
+        Value(0, output_field=IntegerField())
+    )
+
+
+def mark(flag, value, user_ids, post_ids):
+    """
+    Set `flag` to `value` on the entries of every (user, post) pair given,
+    creating the missing entries when the flag is set and dropping the ones
+    left without affinity when it is cleared.
+    """
+    from users.models import User
+    from .models import FeedEntry
+
+    user_ids, post_ids = list(user_ids), list(post_ids)
+    if not user_ids or not post_ids:
+        return
+    entries = FeedEntry.objects.filter(
+        user_id__in=user_ids,
+        post_id__in=post_ids
+    )
+    if value:
+        existing = set(entries.values_list('user_id', 'post_id'))
+        entries.update(**{flag: True})
+        missing = [
+            FeedEntry(user_id=user_id, post_id=post_id, **{flag: True})
+            for user_id in user_ids
+            for post_id in post_ids
+            if (user_id, post_id) not in existing
+        ]
+        try:
+            with transaction.atomic():
+                FeedEntry.objects.bulk_create(missing)
+        except IntegrityError:
+            # Some entries were created by another signal meanwhile
+            for entry in missing:
+                try:
+                    with transaction.atomic():
+                        entry.save(force_insert=True)
+                except IntegrityError:
+                    FeedEntry.objects.filter(
+                        user_id=entry.user_id,
+                        post_id=entry.post_id
+                    ).update(**{flag: True})
+    else:
+        entries.update(**{flag: False})
+    vets = User.objects.filter(
+        pk__in=user_ids,
+        groups_id__in=User.IS_VET
+    ).values_list('id', flat=True)
+    for is_vet, audience in (
+        (True, entries.filter(user_id__in=vets)),
+        (False, entries.exclude(user_id__in=vets))
+    ):
+        audience.update(points=points_expression(get_weights(is_vet)))
+    if not value:
+        entries.filter(**dict((key, False) for key in FLAGS)).delete()
+
+
+def new_post(post):
+    mark('own', True, [post.user_id], [post.id])
+    queue.enqueue('posts.feed.fan_out_post', post.id)
+
+
+def fan_out_post(post_id):
+    """Add the new post to the entries of the followers of its author."""
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id).only('user_id').first()
+    if post is None:
+        return
+    # The entries are only written once, so the followers are read from the
+    # database instead of the follow graph cache, whose copies in the other
+    # processes may be stale for FOLLOW_GRAPH_TTL seconds
+    followers = graph.load(graph.FOLLOWERS, post.user_id)
+    mark('follows_author', True, followers, [post_id])
+
+
+def post_liked(user_id, post_id, liked=True):
+    mark('liked', liked, [user_id], [post_id])
+
+
+def post_commented(user_id, post_id):
+    mark('commented', True, [user_id], [post_id])
+
+
+def follows_changed(user_id, followee_ids, follows=True):
+    from .models import Post
+
+    # Posts past the horizon do not score affinity, see recency.prune
+    post_ids = Post.objects.filter(
+        user_id__in=followee_ids,
+        recency__gt=0
+    ).values_list('id', flat=True)
+    mark('follows_author', follows, [user_id], post_ids)
+
+
+def reweight(is_vet):
+    """
+    Recompute the points of every entry of the audience after its weights
+    changed.
+    """
+    from users.models import User
+    from .models import FeedEntry
+
+    groups = User.IS_VET if is_vet else User.IS_OWNER
+    FeedEntry.objects.filter(
+        user__in=User.objects.filter(groups_id__in=groups)
+    ).update(points=points_expression(get_weights(is_vet)))
+
+
+def rebuild(user):
+    """
+    Recompute from scratch every entry of the given user, used for the users
+    that had activity before the store existed or whose entries drifted.
+    """
+    from comments.models import Comment
+    from .models import FeedEntry, Post, UserLikesPost
+
+    flags = {
+        'liked': UserLikesPost.objects.filter(
+            user=user
+        ).values_list('post_id', flat=True),
+        'commented': Comment.objects.filter(
+            user=user
+        ).values_list('post_id', flat=True),
+        'follows_author': Post.objects.filter(
+            user_id__in=graph.load(graph.FOLLOWEES, user.id)
+        ).values_list('id', flat=True),
+        'own': Post.objects.filter(user=user).values_list('id', flat=True)
+    }
+    entries = {}
+    for flag, post_ids in flags.items():
+        for post_id in post_ids:
+            entry = entries.setdefault(
+                post_id,
+                FeedEntry(user_id=user.id, post_id=post_id)
+            )
+            setattr(entry, flag, True)
+    weights = get_weights(user.is_vet())
+    for entry in entries.values():
+        entry.points = entry_points(entry, weights)
+    FeedEntry.objects.filter(user=user).delete()
+    FeedEntry.objects.bulk_create(entries.values(), batch_size=500)
+    return len(entries)
+
+
+def live_queryset(user, filters):
+    """
+    The feed as computed before the store existed: every post of the
+    audience scored by CASE expressions. Kept to check the store against it.
+    """
+    from .models import Post
+
+    weights = get_weights(user.is_vet())
+    commented = list(
+        set(user.comments.values_list('post_id', flat=True))
+    ) or [0]
+    followees = graph.followees(user.id) or [0]
+    # Like the store, the affinity with posts past the horizon is ignored
+    live = Q(recency__gt=0)
+    cases = (
+        (weights.liked, Q(pk__in=user.likes.all()) & live),
+        (weights.commented, Q(pk__in=commented) & live),
+        (weights.follows_author, Q(user_id__in=followees) & live),
+        (weights.own, Q(user=user.id) & live),
+        (weights.paid, Q(visible_by_vet=True, visible_by_owner=True)),
+    )
+    points = sum(
+        (
+            Case(
+                When(condition, then=Value(weight)),
+                default=Value(0),
+                output_field=FloatField()
+            ) for weight, condition in cases
+        ),
+        F('recency') * Value(weights.new, output_field=FloatField())
+    )
+    interested = Case(
+        When(pk__in=user.likes.all(), then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    return Post.objects.annotate(
+        points=points,
+        interested=interested
+    ).filter(**filters).order_by('-points', '-id')
+
+
+class MaterializedFeed(object):
+    """
+    Sequence of the posts of a user feed, sliced by the paginator. Only the
+    posts of the requested slice are loaded through `queryset`, which is
+    expected to carry the annotations and prefetches the serializer needs.
+    """
+
+    def __init__(self, user, filters, queryset):
+        from .models import Post
+
+        self.user = user
+        self.filters = filters
+        self.audience = Post.objects.filter(**filters)
+        self.queryset = queryset
+        self.engine = get_engine(user)
+        self.page_size = self.engine.weights.post_quantity or None
+
+    def count(self):
+        return self.audience.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        return self.load(self.ranked_ids(index.stop)[start:index.stop])
+
+    def keyset_page(self, position, limit):
+        """
+        Page of `limit` posts ranked after `position`, the (score, id) of
+        the last post served, and the position of the next page.
+        """
+        ranked = self.rank(limit + 1, position)
+        next_position = None
+        if len(ranked) > limit:
+            post_id, score = ranked[limit - 1]
+            next_position = [score, post_id]
+        return self.load([pk for pk, _ in ranked[:limit]]), \
+            next_position
+
+    def load(self, ids):
+        posts = dict(
+            (post.id, post) for post in self.queryset.filter(id__in=ids)
+        )
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def ranked_ids(self, limit):
+        return [post_id for post_id, _ in self.rank(limit)]
+
+    def rank(self, limit, position=None):
+        from .models import FeedEntry
+
+        entries = FeedEntry.objects.filter(
+            user=self.user,
+            **dict(('post__' + key, value)
+                   for key, value in self.filters.items())
+        )
+        return self.engine.rank(self.audience, entries, limit, position)
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+
+from users.models import User
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the first feed pages served from the materialized store '
+        'with the ones computed by the live scoring query'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int)
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=50,
+            help='Amount of random users to check when no ids are given'
+        )
+        parser.add_argument('--depth', type=int, default=100)
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Rebuild the entries of the users that do not match'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).select_related('groups')
+        if options['user_ids']:
+            users = users.filter(pk__in=options['user_ids'])
+        else:
+            users = users.order_by('?')[:options['sample']]
+        depth = options['depth']
+        mismatches = 0
+        for user in users:
+            filters = feed.audience_filters(user.is_vet())
+            expected = list(
+                feed.live_queryset(user, filters).values_list(
+                    'id', flat=True
+                )[:depth]
+            )
+            served = feed.MaterializedFeed(
+                user, filters, None
+            ).ranked_ids(depth)
+            if expected == served:
+                continue
+            mismatches += 1
+            self.stdout.write(
+                'User %s: first difference at position %s' % (
+                    user.id, self.first_difference(expected, served)
+                )
+            )
+            if options['repair']:
+                feed.rebuild(user)
+        self.stdout.write(
+            '%s of %s users do not match' % (mismatches, len(users))
+        )
+
+    @staticmethod
+    def first_difference(expected, served):
+        for index, (left, right) in enumerate(zip(expected, served)):
+            if left != right:
+                return index
+        return min(len(expected), len(served))
@@ -0,0 +1,35 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from TapVet import images
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the content addressed image files left without any image '
+        'referring to them, run it from cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=24,
+            help='Hours a file is kept after it was last written'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the files that would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        deleted = images.collect_garbage(
+            default_storage,
+            options['grace'] * 3600,
+            dry_run=options['dry_run']
+        )
+        if options['verbosity'] > 1:
+            for name in deleted:
+                self.stdout.write(name)
+        self.stdout.write('Collected %s files' % len(deleted))
@@ -0,0 +1,315 @@
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from activities.models import Activity
+from comments.models import Comment
+from posts.models import ImagePost, Post, UserLikesPost
+from users.models import User, Veterinarian
+
+# Every generated user has this username prefix and password
+USERNAME_PREFIX = 'dataset-'
+PASSWORD = 'dataset'
+
+# Share of the users of each group: owners, breeders, vets, students and
+# technicians
+GROUP_WEIGHTS = ((1, 55), (2, 15), (3, 15), (4, 10), (5, 5))
+
+WORDS = (
+    'dog', 'cat', 'horse', 'vaccine', 'diet', 'itchy', 'skin', 'limping',
+    'puppy', 'kitten', 'senior', 'teeth', 'fur', 'ear', 'eye', 'walk',
+    'food', 'allergy', 'surgery', 'checkup', 'happy', 'tired', 'help',
+)
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@contextmanager
+def backdated(*models):
+    """Let bulk_create keep the given created_at and updated_at values."""
+    fields = [
+        field for model in models for field in model._meta.fields
+        if getattr(field, 'auto_now', False) or
+        getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a synthetic social graph (users, posts, '
+        'images, likes, comments, follows and activities) to measure '
+        'performance, the same seed always gives the same data. Never run '
+        'it against production'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument(
+            '--likes', type=float, default=5,
+            help='Average likes per post'
+        )
+        parser.add_argument(
+            '--comments', type=float, default=2,
+            help='Average comments per post'
+        )
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='Average follows per user'
+        )
+        parser.add_argument(
+            '--days', type=int, default=60,
+            help='Days the posts are spread over'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-derived',
+            action='store_true',
+            help='Do not rebuild the counters, recency, feed and inboxes'
+        )
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('There is a generated dataset already')
+        self.rng = random.Random(options['seed'])
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        with backdated(Post, UserLikesPost, Comment, Activity):
+            self.create_users(options['users'])
+            self.create_posts(options['posts'])
+            self.create_likes(options['likes'])
+            self.create_comments(options['comments'])
+            self.create_follows(options['follows'])
+        if not options['skip_derived']:
+            for command, kwargs in (
+                ('reconcile_counters', {}),
+                ('refresh_recency', {}),
+                ('rebuild_feed', {'all': True}),
+                ('rebuild_inbox', {}),
+            ):
+                call_command(command, stdout=self.stdout, **kwargs)
+
+    def bulk_create(self, model, rows):
+        created = 0
+        for chunk in chunks(rows, self.batch_size):
+            model.objects.bulk_create(chunk)
+            created += len(chunk)
+            if self.verbosity > 1:
+                self.stdout.write('%s %s' % (created, model.__name__))
+        self.stdout.write('Created %s %s rows' % (created, model.__name__))
+        return created
+
+    def bulk_create_with_activities(self, model, pairs):
+        """Rows of `model` and their activities, given in pairs."""
+        created = 0
+        for chunk in chunks(pairs, self.batch_size):
+            model.objects.bulk_create([row for row, _ in chunk])
+            Activity.objects.bulk_create([activity for _, activity in chunk])
+            created += len(chunk)
+            if self.verbosity > 1:
+                self.stdout.write('%s %s' % (created, model.__name__))
+        self.stdout.write('Created %s %s rows and their activities' % (
+            created, model.__name__
+        ))
+        return created
+
+    def last_id(self, model):
+        last = model.objects.order_by('-id').values_list('id', flat=True)
+        return last.first() or 0
+
+    def skewed(self, count):
+        """Index in range(count), the first ones much more often."""
+        return int(count * self.rng.random() ** 3)
+
+    def amount(self, average):
+        return int(self.rng.expovariate(1.0 / average)) if average else 0
+
+    def moment(self, after=None):
+        if after is None:
+            return self.now - timedelta(
+                seconds=self.rng.random() * self.days * 86400
+            )
+        return min(
+            self.now,
+            after + timedelta(seconds=self.rng.random() * 2 * 86400)
+        )
+
+    def text(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        groups = [group for group, weight in GROUP_WEIGHTS
+                  for _ in range(weight)]
+        first_id = self.last_id(User)
+        self.bulk_create(User, (
+            User(
+                username='%s%s' % (USERNAME_PREFIX, index),
+                email='%s%s@example.com' % (USERNAME_PREFIX, index),
+                full_name=self.text(2).title(),
+                password=password,
+                groups_id=self.rng.choice(groups),
+            ) for index in range(count)
+        ))
+        self.users = list(User.objects.filter(
+            id__gt=first_id, username__startswith=USERNAME_PREFIX
+        ).order_by('id').values_list('id', 'groups_id'))
+        self.verified = set()
+        vets = []
+        for user_id, group in self.users:
+            if group in User.IS_VET:
+                verified = group == 4 or self.rng.random() < 0.8
+                if verified:
+                    self.verified.add(user_id)
+                vets.append(Veterinarian(
+                    user_id=user_id,
+                    veterinarian_type=str(group),
+                    verified=verified
+                ))
+        self.bulk_create(Veterinarian, vets)
+        self.bulk_create(Token, (
+            Token(key='%040x' % self.rng.getrandbits(160), user_id=user_id)
+            for user_id, _ in self.users
+        ))
+
+    def create_posts(self, count):
+        first_id = self.last_id(Post)
+
+        def posts():
+            for _ in range(count):
+                user_id, group = self.users[self.skewed(len(self.users))]
+                created_at = self.moment()
+                if group in User.IS_VET:
+                    visible_by_vet = user_id in self.verified
+                    visible_by_owner = False
+                else:
+                    visible_by_vet = self.rng.random() < 0.05
+                    visible_by_owner = True
+                yield Post(
+                    user_id=user_id,
+                    description=self.text(self.rng.randint(3, 30)),
+                    visible_by_vet=visible_by_vet,
+                    visible_by_owner=visible_by_owner,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+        self.bulk_create(Post, posts())
+        self.post_ids, self.post_times = array('I'), []
+        for post_id, created_at in Post.objects.filter(
+            id__gt=first_id
+        ).order_by('id').values_list('id', 'created_at').iterator():
+            self.post_ids.append(post_id)
+            self.post_times.append(created_at)
+        self.bulk_create(ImagePost, (
+            ImagePost(
+                post_id=post_id,
+                image_number=1,
+                standard='dataset/standard.jpg',
+                thumbnail='dataset/thumbnail.jpg'
+            ) for post_id in self.post_ids
+        ))
+
+    def create_likes(self, average):
+        def likes():
+            for post_id, created_at in zip(self.post_ids, self.post_times):
+                likers = set(
+                    self.users[self.skewed(len(self.users))][0]
+                    for _ in range(self.amount(average))
+                )
+                for user_id in sorted(likers):
+                    liked_at = self.moment(created_at)
+                    yield UserLikesPost(
+                        user_id=user_id, post_id=post_id, created_at=liked_at
+                    ), Activity(
+                        user_id=user_id, action=Activity.LIKE,
+                        post_id=post_id, created_at=liked_at,
+                        updated_at=liked_at
+                    )
+        self.bulk_create_with_activities(UserLikesPost, likes())
+
+    def create_comments(self, average):
+        first_id = self.last_id(Comment)
+
+        def comments():
+            for post_id, created_at in zip(self.post_ids, self.post_times):
+                for _ in range(self.amount(average)):
+                    commented_at = self.moment(created_at)
+                    user_id, group = self.users[self.skewed(len(self.users))]
+                    yield Comment(
+                        description=self.text(self.rng.randint(3, 40)),
+                        user_id=user_id,
+                        post_id=post_id,
+                        author_audience=Comment.VET if group in User.IS_VET
+                        else Comment.OWNER,
+                        created_at=commented_at,
+                        updated_at=commented_at,
+                    )
+        self.bulk_create(Comment, comments())
+        self.bulk_create(Activity, (
+            Activity(
+                user_id=user_id, action=Activity.COMMENT, post_id=post_id,
+                comment_id=comment_id, created_at=created_at,
+                updated_at=created_at
+            ) for comment_id, user_id, post_id, created_at in
+            Comment.objects.filter(id__gt=first_id).values_list(
+                'id', 'user_id', 'post_id', 'created_at'
+            ).iterator()
+        ))
+
+    def create_follows(self, average):
+        """
+        Owners and breeders follow each other, vets only follow verified
+        vets, like UserFollowView allows.
+        """
+        owners = [user_id for user_id, group in self.users
+                  if group in User.IS_OWNER]
+        vets = sorted(self.verified)
+
+        def follows():
+            for user_id, group in self.users:
+                targets = owners if group in User.IS_OWNER else vets
+                if not targets or (
+                    group not in User.IS_OWNER and user_id not in self.verified
+                ):
+                    continue
+                followees = set(
+                    targets[self.skewed(len(targets))]
+                    for _ in range(self.amount(average))
+                ) - set([user_id])
+                for followee in sorted(followees):
+                    followed_at = self.moment()
+                    yield User.follows.through(
+                        from_user_id=user_id, to_user_id=followee
+                    ), Activity(
+                        user_id=user_id, action=Activity.FOLLOW,
+                        follows_id=followee, created_at=followed_at,
+                        updated_at=followed_at
+                    )
+        self.bulk_create_with_activities(User.follows.through, follows())
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from users.models import User
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the materialized feed entries of the given users, of the '
+        'users without entries (--cold) or of every user (--all)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Only users that do not have any feed entry yet'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Every active user'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        if options['user_ids']:
+            users = users.filter(pk__in=options['user_ids'])
+        elif options['cold']:
+            users = users.filter(feed_entries__isnull=True)
+        elif not options['all']:
+            self.stderr.write('Give some user ids, --cold or --all')
+            return
+        rebuilt = entries = 0
+        for user in users.iterator():
+            entries += feed.rebuild(user)
+            rebuilt += 1
+        self.stdout.write(
+            'Rebuilt %s users, %s feed entries' % (rebuilt, entries)
+        )
@@ -0,0 +1,54 @@
+from django.db.models import Count
+from django.core.management.base import BaseCommand
+
+from comments.models import Comment
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Repair the drift of the denormalized counters: Post.likes_count '
+        'and Comment.upvoters_count'
+    )
+    counters = (
+        (Post, 'likes_count', 'user_likes'),
+        (Comment, 'upvoters_count', 'upvoters'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model, field, relation in self.counters:
+            repaired = self.reconcile(
+                model, field, relation, options['batch_size']
+            )
+            self.stdout.write('%s.%s: %s rows repaired' % (
+                model.__name__, field, repaired
+            ))
+
+    @staticmethod
+    def reconcile(model, field, relation, batch_size):
+        """
+        Walk the table by primary key ranges, counting the related rows of
+        each batch in one GROUP BY query and updating only the rows that
+        drifted.
+        """
+        repaired = 0
+        last_id = 0
+        while True:
+            ids = list(
+                model.objects.filter(pk__gt=last_id).order_by(
+                    'pk'
+                ).values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return repaired
+            last_id = ids[-1]
+            rows = model.objects.filter(pk__in=ids).annotate(
+                actual=Count(relation)
+            ).values_list('pk', field, 'actual')
+            for pk, stored, actual in rows:
+                if stored != actual:
+                    model.objects.filter(pk=pk).update(**{field: actual})
+                    repaired += 1
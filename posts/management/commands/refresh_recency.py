@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import recency
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the time decay score of the posts and delete the feed '
+        'entries of the posts past the horizon, run it from cron'
+    )
+
+    def handle(self, *args, **options):
+        updated = recency.refresh()
+        self.stdout.write('Refreshed the recency of %s posts' % updated)
+        deleted = recency.prune()
+        self.stdout.write('Deleted %s feed entries' % deleted)
@@ -0,0 +1,148 @@
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from posts.models import Post
+from users.models import User
+
+from .generate_dataset import USERNAME_PREFIX
+
+# Share of each action in the replayed traffic
+DEFAULT_MIX = 'feed=45,post=20,like=10,comment=10,activity=15'
+
+
+def percentile(values, rank):
+    """Nearest rank percentile of sorted `values`."""
+    if not values:
+        return 0
+    index = int(math.ceil(rank / 100.0 * len(values))) - 1
+    return values[max(index, 0)]
+
+
+def parse_mix(mix):
+    try:
+        weights = [
+            (name, int(weight)) for name, weight in
+            (item.split('=') for item in mix.split(','))
+        ]
+    except ValueError:
+        raise CommandError('The mix looks like %s' % DEFAULT_MIX)
+    unknown = set(name for name, _ in weights) - set(Command.actions)
+    if unknown:
+        raise CommandError('Unknown actions: %s' % ', '.join(sorted(unknown)))
+    return [name for name, weight in weights for _ in range(weight)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a traffic mix of the generated dataset users (see '
+        'generate_dataset) against a running server and report the p50, '
+        'p95 and p99 latency of every action'
+    )
+    # Method, path and the statuses over 2xx that are not errors: liking a
+    # post twice is a 409
+    actions = {
+        'feed': ('GET', '/api/v1/posts/?cursor=', ()),
+        'post': ('GET', '/api/v1/posts/%(post)s/', ()),
+        'like': ('POST', '/api/v1/posts/%(post)s/vote/', (409,)),
+        'comment': ('POST', '/api/v1/posts/%(post)s/pet-comments/', ()),
+        'activity': ('GET', '/api/v1/activities/?cursor=', ()),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://localhost:8000',
+            help='Base URL of the server'
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--mix', default=DEFAULT_MIX)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--sample', type=int, default=1000,
+            help='Number of users and of posts the requests pick from'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        mix = parse_mix(options['mix'])
+        tokens = list(Token.objects.filter(
+            user__username__startswith=USERNAME_PREFIX,
+            user__groups_id__in=User.IS_OWNER
+        ).order_by('user_id').values_list('key', flat=True)[
+            :options['sample']
+        ])
+        posts = list(Post.objects.filter(
+            active=True, visible_by_owner=True
+        ).order_by('-id').values_list('id', flat=True)[:options['sample']])
+        if not tokens or not posts:
+            raise CommandError('Run generate_dataset first')
+        jobs = [
+            (rng.choice(mix), rng.choice(tokens), rng.choice(posts))
+            for _ in range(options['requests'])
+        ]
+        self.url = options['url'].rstrip('/')
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        start = time.time()
+        concurrency = options['concurrency']
+        workers = [
+            threading.Thread(
+                target=self.work, args=(jobs[index::concurrency],)
+            )
+            for index in range(concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.report(time.time() - start)
+
+    def work(self, jobs):
+        session = requests.Session()
+        for action, token, post_id in jobs:
+            method, path, expected = self.actions[action]
+            data = None
+            if action == 'comment':
+                data = {'description': 'Replayed comment'}
+            start = time.time()
+            try:
+                response = session.request(
+                    method,
+                    self.url + path % {'post': post_id},
+                    data=data,
+                    headers={'Authorization': 'Token %s' % token},
+                    timeout=30
+                )
+                failed = response.status_code >= 300 and \
+                    response.status_code not in expected
+            except requests.RequestException:
+                failed = True
+            milliseconds = (time.time() - start) * 1000
+            with self.lock:
+                self.timings[action].append(milliseconds)
+                if failed:
+                    self.errors[action] += 1
+
+    def report(self, seconds):
+        total = sum(len(timings) for timings in self.timings.values())
+        self.stdout.write('%s requests in %.1fs, %.1f requests/s' % (
+            total, seconds, total / seconds if seconds else 0
+        ))
+        self.stdout.write('%-10s %8s %8s %8s %8s %8s' % (
+            'action', 'count', 'errors', 'p50 ms', 'p95 ms', 'p99 ms'
+        ))
+        for action in sorted(self.timings):
+            timings = sorted(self.timings[action])
+            self.stdout.write('%-10s %8s %8s %8.0f %8.0f %8.0f' % (
+                action, len(timings), self.errors[action],
+                percentile(timings, 50), percentile(timings, 95),
+                percentile(timings, 99)
+            ))
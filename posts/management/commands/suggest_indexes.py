@@ -0,0 +1,127 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from helpers.budgets import load_budgets, normalize
+from posts.models import Post
+from users.models import User
+
+# EXPLAIN access types that read the whole table or the whole index
+FULL_SCANS = {'ALL': 'full table scan', 'index': 'full index scan'}
+EXTRAS = ('Using filesort', 'Using temporary')
+
+
+def problems(plan, min_rows):
+    """
+    (table, problem, rows, key) of the rows of an EXPLAIN `plan`, given as
+    dicts, that read at least `min_rows` rows without a fitting index.
+    """
+    found = []
+    for row in plan:
+        rows = int(row.get('rows') or 0)
+        if rows < min_rows:
+            continue
+        issues = []
+        if row.get('type') in FULL_SCANS:
+            issues.append(FULL_SCANS[row['type']])
+        extra = row.get('Extra') or ''
+        issues += [item[len('Using '):] for item in EXTRAS if item in extra]
+        if issues:
+            found.append(
+                (row.get('table'), ', '.join(issues), rows, row.get('key'))
+            )
+    return found
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Request the endpoints of helpers/budgets.json, run EXPLAIN on the '
+        'queries they make and report the full scans, filesorts and '
+        'temporary tables. MySQL only, run it against a copy of production '
+        'or a generated dataset'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'endpoints', nargs='*',
+            help='Names of the endpoints, all of them by default'
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Ignore the tables where fewer rows are examined'
+        )
+        parser.add_argument('--owner', type=int, help='Id of the owner')
+        parser.add_argument('--vet', type=int, help='Id of the vet')
+        parser.add_argument('--post', type=int, help='Id of the post')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'mysql':
+            raise CommandError('The query plans can only be read on MySQL')
+        endpoints = load_budgets()['endpoints']
+        names = options['endpoints'] or sorted(endpoints)
+        unknown = set(names) - set(endpoints)
+        if unknown:
+            raise CommandError(
+                'Unknown endpoints: %s' % ', '.join(sorted(unknown))
+            )
+        users = {
+            'owner': self.pick(User.objects.filter(
+                groups_id__in=User.IS_OWNER
+            ), options['owner']),
+            'vet': self.pick(User.objects.filter(
+                groups_id__in=User.IS_VET, veterinarian__verified=True
+            ), options['vet']),
+        }
+        context = {
+            'owner': users['owner'].id,
+            'vet': users['vet'].id,
+            'post': self.pick(Post.objects.filter(
+                active=True, visible_by_owner=True
+            ), options['post']).id,
+        }
+        flagged = 0
+        for name in names:
+            flagged += self.check(
+                name, endpoints[name], users, context, options['min_rows']
+            )
+        self.stdout.write('%s problems found' % flagged)
+
+    @staticmethod
+    def pick(queryset, pk):
+        instance = queryset.filter(pk=pk).first() if pk else \
+            queryset.order_by('-id').first()
+        if instance is None:
+            raise CommandError(
+                'No %s to request with' % queryset.model.__name__
+            )
+        return instance
+
+    def check(self, name, endpoint, users, context, min_rows):
+        client = APIClient()
+        if endpoint.get('user'):
+            client.force_authenticate(users[endpoint['user']])
+        # The requests should not write anything, but make sure of it
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                client.get(endpoint['url'].format(**context))
+            transaction.set_rollback(True)
+        seen, flagged = set(), 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or normalize(sql) in seen:
+                continue
+            seen.add(normalize(sql))
+            for table, problem, rows, key in problems(explain(sql), min_rows):
+                flagged += 1
+                self.stdout.write('%s: %s on %s, %s rows, key %s\n    %s' % (
+                    name, problem, table, rows, key, sql
+                ))
+        return flagged
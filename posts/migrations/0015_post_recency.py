@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-08 18:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def set_recency(apps, schema_editor):
+    from posts import recency
+
+    recency.refresh(Post=apps.get_model('posts', 'Post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='recency',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together=set([('active', 'visible_by_owner', 'recency'), ('active', 'visible_by_vet', 'visible_by_owner', 'recency')]),
+        ),
+        migrations.RunPython(set_recency, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-13 11:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import posts.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_likes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagepost',
+            name='original',
+            field=models.ImageField(blank=True, upload_to=posts.models.uploads_path),
+        ),
+        migrations.AddField(
+            model_name='imagepost',
+            name='state',
+            field=models.CharField(choices=[('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='imagepost',
+            name='standard',
+            field=models.ImageField(blank=True, upload_to=posts.models.uploads_path),
+        ),
+        migrations.AlterField(
+            model_name='imagepost',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to=posts.models.uploads_path),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-22 10:10
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_imagepost_original_cas'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together=set([('active', 'visible_by_owner', 'recency'), ('active', 'visible_by_vet', 'visible_by_owner', 'recency'), ('active', 'visible_by_owner', 'id'), ('active', 'visible_by_vet', 'visible_by_owner', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='userlikespost',
+            index_together=set([('user', 'created_at'), ('post', 'created_at')]),
+        ),
+    ]
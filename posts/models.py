@@ -3,8 +3,12 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db.models.signals import post_save, post_delete
 
+from TapVet import images
+
+from . import page_cache
 from .signals import (
-    post_reporting_signal, new_post_like_signal, inactive_post_like_signal
+    post_reporting_signal, new_post_like_signal, inactive_post_like_signal,
+    new_post_signal, feed_variable_changed, image_post_saved
 )
 
 min_max_range = [
@@ -30,6 +34,9 @@ class UserLikesPost(models.Model):
 
     class Meta:
         unique_together = ('user', 'post')
+        # The likes of a user by date, and the likers of a post before a
+        # given date for the inbox fan out
+        index_together = (('user', 'created_at'), ('post', 'created_at'))
 
     def __unicode__(self):
         return u'User: %s likes Post_id: %s' % (
@@ -66,12 +73,33 @@ class Post(models.Model):
         blank=True
     )
     active = models.BooleanField(default=True)
+    # Kept up to date by the UserLikesPost signals
+    likes_count = models.PositiveIntegerField(default=0)
+    # Time decay score, refreshed by the refresh_recency command
+    recency = models.FloatField(default=1.0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        index_together = (
+            ('active', 'visible_by_owner', 'recency'),
+            ('active', 'visible_by_vet', 'visible_by_owner', 'recency'),
+            # Anonymous feed, newest first
+            ('active', 'visible_by_owner', 'id'),
+            ('active', 'visible_by_vet', 'visible_by_owner', 'id'),
+        )
+
     def __unicode__(self):
         return u'Post %s - created at: %s' % (self.id, self.created_at)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Post, cls).from_db(db, field_names, values)
+        # Feeds the post was listed in, invalidated too when it moves
+        if {'visible_by_vet', 'visible_by_owner'} <= set(field_names):
+            instance._loaded_audiences = page_cache.audiences(instance)
+        return instance
+
     def set_paid(self):
         self.visible_by_vet = True
         self.visible_by_owner = True
@@ -81,7 +109,7 @@ class Post(models.Model):
         return self.visible_by_owner and self.visible_by_vet
 
     def get_likes(self):
-        return self.likers.count()
+        return self.likes_count
 
     def get_images(self):
         return self.images.count()
@@ -97,18 +125,62 @@ class Post(models.Model):
         super(Post, self).save(*args, **kwargs)
 
 
+# Func to connect the signal on post save.
+post_save.connect(
+    new_post_signal,
+    sender=Post,
+    dispatch_uid="posts.models.post_post_save"
+)
+
+
+class FeedEntry(models.Model):
+    '''
+    Affinity of a user with a post, materialized by posts.feed
+    '''
+    user = models.ForeignKey('users.User', related_name='feed_entries')
+    post = models.ForeignKey(Post, related_name='feed_entries')
+    liked = models.BooleanField(default=False)
+    commented = models.BooleanField(default=False)
+    follows_author = models.BooleanField(default=False)
+    own = models.BooleanField(default=False)
+    points = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'post')
+        index_together = ('user', 'points', 'post')
+
+    def __unicode__(self):
+        return u'User: %s - Post: %s - points: %s' % (
+            self.user_id, self.post_id, self.points
+        )
+
+
 class ImagePost(models.Model):
     post = models.ForeignKey(Post, related_name='images')
     image_number = models.PositiveSmallIntegerField(
         choices=((1, 1), (2, 2), (3, 3)), default=1)
-    standard = models.ImageField(upload_to=uploads_path)
-    thumbnail = models.ImageField(upload_to=uploads_path)
+    original = models.ImageField(
+        upload_to=images.ContentAddressedPath('original'), blank=True
+    )
+    standard = models.ImageField(upload_to=uploads_path, blank=True)
+    thumbnail = models.ImageField(upload_to=uploads_path, blank=True)
+    state = models.CharField(
+        choices=images.STATE_CHOICES, max_length=10, default=images.READY
+    )
 
     def __unicode__(self):
         return u'Post %s - created at: %s' % (
             self.post.id, self.post.created_at)
 
 
+# Func to connect the signal on image post save.
+post_save.connect(
+    image_post_saved,
+    sender=ImagePost,
+    dispatch_uid="posts.models.imagepost_post_save"
+)
+
+
 class PaymentAmount(models.Model):
     description = models.CharField(max_length=100)
     value = models.PositiveIntegerField(default=100)
@@ -136,6 +208,7 @@ class FeedVariable(models.Model):
     new_posts = models.PositiveSmallIntegerField(
         validators=min_max_range
     )
+    # Unused by the vet feed, which has no paid posts
     paid_posts = models.PositiveSmallIntegerField(
         validators=min_max_range,
         null=True,
@@ -143,6 +216,19 @@ class FeedVariable(models.Model):
     )
 
 
+# Func to connect the signals on feed variable save and delete.
+post_save.connect(
+    feed_variable_changed,
+    sender=FeedVariable,
+    dispatch_uid="posts.models.feedvariable_post_save"
+)
+post_delete.connect(
+    feed_variable_changed,
+    sender=FeedVariable,
+    dispatch_uid="posts.models.feedvariable_post_delete"
+)
+
+
 class ActivePost(models.Model):
     post = models.ForeignKey('posts.Post', related_name='active_post_weight')
     created_at = models.DateTimeField(auto_now_add=True)
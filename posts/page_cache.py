@@ -0,0 +1,126 @@
+"""
+Shared cache of the feed pages served to anonymous users.
+
+Every anonymous caller of `?vet` or `?owner` gets the same pages, so they
+are kept in the Redis of the queue, shared by every process, or in the
+FEED_CACHE alias of CACHES when there is no Redis. Pages are keyed by
+audience and pagination params. Each audience has a version, the time of
+its last change, moved forward when one of its posts is saved (created,
+deactivated, paid) or gets its images rendered. A page of an older
+version, or older than FEED_CACHE_TTL seconds, is stale: the request that
+takes the lock of the page refreshes it while the others keep serving the
+stale copy, so a burst of launches right after a change runs the feed
+queries once.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import urlencode
+from django.utils.six.moves import cPickle as pickle
+
+from TapVet import queue
+
+VET, OWNER = 'vet', 'owner'
+# The query params that select the page, the others give the same data
+PAGE_PARAMS = ('page', 'page_size', 'cursor')
+
+
+class RedisCache(object):
+    """The part of the cache API used here, on top of a Redis client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key, default=None):
+        value = self.client.get(key)
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        self.client.set(
+            key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=timeout
+        )
+
+    def add(self, key, value, timeout):
+        return bool(self.client.set(
+            key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=timeout,
+            nx=True
+        ))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+def get_cache():
+    client = queue.get_redis()
+    if client is None:
+        return caches[settings.FEED_CACHE]
+    return RedisCache(client)
+
+
+def audiences(post):
+    """Anonymous feeds the post is listed in, see feed.audience_filters."""
+    if post.visible_by_owner:
+        return [OWNER]
+    if post.visible_by_vet:
+        return [VET]
+    return []
+
+
+def version_key(audience):
+    return 'feed:anonymous:%s:version' % audience
+
+
+def get_version(audience):
+    cache = get_cache()
+    version = cache.get(version_key(audience))
+    if version is None:
+        # Lost versions restart from now, so older pages go stale
+        version = time.time()
+        cache.add(version_key(audience), version, None)
+    return version
+
+
+def invalidate(audience_list):
+    cache = get_cache()
+    for audience in audience_list:
+        cache.set(version_key(audience), time.time(), None)
+
+
+def page_key(audience, params):
+    return 'feed:anonymous:%s:%s' % (audience, urlencode(sorted(
+        (name, params[name]) for name in PAGE_PARAMS if name in params
+    )))
+
+
+def get_page(audience, params, compute):
+    """
+    Cached data of the page selected by the query `params`, `compute` is
+    called to build it when it is missing or stale and no other request is
+    already refreshing it.
+    """
+    cache = get_cache()
+    key = page_key(audience, params)
+    version = get_version(audience)
+    cached = cache.get(key)
+    locked = False
+    if cached is not None:
+        cached_version, fresh_until, data = cached
+        if cached_version >= version and fresh_until > time.time():
+            return data
+        locked = cache.add(
+            key + ':lock', True, settings.FEED_CACHE_LOCK_TIMEOUT
+        )
+        if not locked:
+            return data
+    try:
+        data = compute()
+        cache.set(
+            key,
+            (version, time.time() + settings.FEED_CACHE_TTL, data),
+            settings.FEED_CACHE_TTL + settings.FEED_CACHE_STALE_TTL
+        )
+    finally:
+        if locked:
+            cache.delete(key + ':lock')
+    return data
@@ -0,0 +1,200 @@
+"""
+Feed ranking engine.
+
+The weights of every kind of affinity come from the FeedVariable row of the
+audience (vets or pet owners). They are loaded once per process and dropped
+when a FeedVariable is saved, or after FEED_WEIGHTS_TTL seconds so the other
+workers catch up with the admin changes.
+
+The score of a post for a user is its personal part, stored on the user
+FeedEntry, plus its global part (recency and paid posts). Inside a bucket
+of posts (every post, or the paid ones) the global part only grows with the
+stored recency, so the best `limit` posts of the page are among the best
+`limit` entries of the user and the first `limit` posts of each bucket:
+bounded reads, whatever the history of the user.
+The same holds after a keyset cursor once the buckets are cut at the
+recency matching the cursor score.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import (
+    Case, When, Value, F, FloatField, ExpressionWrapper
+)
+from django.utils.module_loading import import_string
+
+Weights = namedtuple('Weights', (
+    'post_quantity', 'liked', 'commented', 'follows_author', 'own', 'new',
+    'paid'
+))
+
+# Same ranking as the unweighted CASE columns used before FeedVariable
+DEFAULT_WEIGHTS = Weights(20, 1, 1, 1, 1, 1, 0)
+
+# Float slack when cutting a bucket at the recency of a cursor score
+RECENCY_TOLERANCE = 1e-9
+
+_weights = {}
+
+
+def get_weights(is_vet):
+    expires, weights = _weights.get(is_vet, (0, None))
+    if expires > time.time():
+        return weights
+    from .models import FeedVariable
+
+    variable = FeedVariable.objects.filter(is_vet=is_vet).last()
+    if variable is None:
+        weights = DEFAULT_WEIGHTS
+    else:
+        weights = Weights(
+            post_quantity=variable.post_quantity,
+            liked=variable.posts_user_has_liked,
+            commented=variable.posts_user_has_comment,
+            follows_author=variable.posts_user_follows,
+            own=variable.posts_by_user,
+            new=variable.new_posts,
+            paid=variable.paid_posts or 0
+        )
+    _weights[is_vet] = (time.time() + settings.FEED_WEIGHTS_TTL, weights)
+    return weights
+
+
+def invalidate_weights():
+    _weights.clear()
+
+
+def get_engine(user):
+    return import_string(settings.FEED_RANKING_ENGINE)(user)
+
+
+class WeightedRanking(object):
+    """
+    Default engine. Subclasses can change the buckets the candidates come
+    from or the global score of a post.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_vet = user.is_vet()
+        self.weights = get_weights(self.is_vet)
+
+    def buckets(self, audience):
+        yield audience
+        if self.weights.paid and self.reaches_paid_posts():
+            yield audience.filter(visible_by_vet=True, visible_by_owner=True)
+
+    def reaches_paid_posts(self):
+        """
+        Paid posts are only in the pet owner feed, the vet one holds the
+        posts of vets (see posts.feed.VET_AUDIENCE), so the paid_posts weight
+        of the vet FeedVariable is unused.
+        """
+        return not self.is_vet
+
+    def global_score(self, recency, visible_by_vet, visible_by_owner):
+        score = recency * self.weights.new
+        if visible_by_vet and visible_by_owner:
+            score += self.weights.paid
+        return score
+
+    def rank(self, audience, entries, limit, position=None):
+        """
+        (id, score) of the best `limit` posts of `audience` given the
+        FeedEntry queryset `entries` of the user. With a `position`
+        (score, id) only the posts ranked after it are returned.
+
+        The entries of the posts past the recency horizon do not count,
+        refresh_recency deletes them.
+        """
+        fields = ('recency', 'visible_by_vet', 'visible_by_owner')
+        entries = entries.filter(post__recency__gt=0)
+        rows = entries.annotate(
+            score=self.score_expression()
+        ).order_by('-score', '-post_id')
+        if position:
+            rows = rows.filter(
+                score__lte=float(position[0]) + RECENCY_TOLERANCE
+            )
+        scores = dict(self.scan(
+            rows.values_list(
+                'post_id', 'points', *['post__' + field for field in fields]
+            ),
+            self.entry_scores, limit, position
+        ))
+        for bucket in self.buckets(audience):
+            rows = bucket.order_by('-recency', '-id').values_list(
+                'id', *fields
+            )
+            if position and self.weights.new > 0:
+                # No post with a global score above the cursor one is left
+                rows = rows.filter(
+                    recency__lte=float(position[0]) / self.weights.new +
+                    RECENCY_TOLERANCE
+                )
+            scores.update(self.scan(
+                rows, self.post_scores(entries), limit, position
+            ))
+        ranked = sorted(
+            (
+                (score, post_id) for post_id, score in scores.items()
+                if self.is_after(score, post_id, position)
+            ),
+            reverse=True
+        )
+        return [(post_id, score) for score, post_id in ranked[:limit]]
+
+    def score_expression(self):
+        """Score of the post of a FeedEntry, computed by the database."""
+        return ExpressionWrapper(
+            F('points'), output_field=FloatField()
+        ) + F('post__recency') * Value(
+            self.weights.new, output_field=FloatField()
+        ) + Case(
+            When(
+                post__visible_by_vet=True,
+                post__visible_by_owner=True,
+                then=Value(self.weights.paid)
+            ),
+            default=Value(0),
+            output_field=FloatField()
+        )
+
+    def entry_scores(self, chunk):
+        return [
+            (row[0], row[1] + self.global_score(*row[2:])) for row in chunk
+        ]
+
+    def post_scores(self, entries):
+        """Scores of a chunk of posts, with the points of their entries."""
+        def scores(chunk):
+            personal = dict(entries.filter(
+                post_id__in=[row[0] for row in chunk]
+            ).values_list('post_id', 'points'))
+            return [
+                (row[0], personal.get(row[0], 0) + self.global_score(*row[1:]))
+                for row in chunk
+            ]
+        return scores
+
+    def scan(self, rows, scores, limit, position):
+        """
+        First `limit` rows, scored a chunk at a time by `scores`, ranked
+        after `position`. The rows already served are skipped in chunks,
+        they are only a few since the rows are cut at the cursor score.
+        """
+        found, start = [], 0
+        while len(found) < limit:
+            chunk = list(rows[start:start + limit])
+            for post_id, score in scores(chunk):
+                if self.is_after(score, post_id, position):
+                    found.append((post_id, score))
+            if len(chunk) < limit:
+                break
+            start += limit
+        return found[:limit]
+
+    @staticmethod
+    def is_after(score, post_id, position):
+        return position is None or (score, post_id) < tuple(position)
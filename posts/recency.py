@@ -0,0 +1,67 @@
+"""
+Time decay score of the posts.
+
+Post.recency halves every FEED_RECENCY_HALF_LIFE hours and drops to zero
+after FEED_RECENCY_HORIZON days. It is stored so the feed can walk the
+(active, visibility, recency) indexes instead of computing the age of every
+post on each request, and refreshed by the refresh_recency command, which is
+meant to run from cron every few minutes.
+
+The age is taken in whole hours, so the posts of the same hour share their
+score and are refreshed by the same UPDATE.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def decay(hours):
+    if hours >= settings.FEED_RECENCY_HORIZON * 24:
+        return 0.0
+    return 0.5 ** (float(hours) / settings.FEED_RECENCY_HALF_LIFE)
+
+
+def age_in_hours(created_at, now):
+    return max(int((now - created_at).total_seconds() // 3600), 0)
+
+
+def refresh(now=None, Post=None):
+    """
+    Recompute the score of every post that still has one, returns the amount
+    of posts updated. The migrations give their historical Post model.
+    """
+    if Post is None:
+        from .models import Post
+
+    now = now or timezone.now()
+    posts = Post.objects.filter(recency__gt=0)
+    by_score = defaultdict(list)
+    for post_id, created_at in posts.values_list('id', 'created_at'):
+        by_score[decay(age_in_hours(created_at, now))].append(post_id)
+    updated = 0
+    for score, post_ids in by_score.items():
+        for index in range(0, len(post_ids), BATCH_SIZE):
+            updated += Post.objects.filter(
+                id__in=post_ids[index:index + BATCH_SIZE]
+            ).exclude(recency=score).update(recency=score)
+    return updated
+
+
+def prune():
+    """
+    Delete the feed entries of the posts past the horizon, they no longer
+    count in the ranking. Returns the amount of entries deleted.
+    """
+    from .models import FeedEntry
+
+    deleted = 0
+    while True:
+        ids = list(FeedEntry.objects.filter(
+            post__recency=0
+        ).values_list('id', flat=True)[:BATCH_SIZE])
+        if not ids:
+            return deleted
+        deleted += FeedEntry.objects.filter(id__in=ids).delete()[0]
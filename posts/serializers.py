@@ -1,34 +1,54 @@
-from StringIO import StringIO
-from PIL import Image as Img
+from django.db.models import Manager
 from rest_framework.serializers import (
-    ModelSerializer, IntegerField, ImageField, ValidationError,
+    ModelSerializer, IntegerField, ValidationError, ListSerializer,
     BooleanField, SerializerMethodField, Serializer, ChoiceField
 )
 
-from TapVet.images import ImageSerializerMixer, STANDARD_SIZE, THUMBNAIL_SIZE
+from TapVet import images, renditions
+from TapVet.images import ImageSerializerMixer, UploadImageField
 from users.serializers import UserSerializers
 
 from .models import Post, ImagePost, PaymentAmount, Report
+from .utils import prefetch_comment_counts
 
 
 class ImagePostSerializer(ModelSerializer):
+    ready = SerializerMethodField(read_only=True)
+    srcset = SerializerMethodField(read_only=True)
 
     class Meta:
         model = ImagePost
-        fields = ('id', 'standard', 'thumbnail')
+        fields = ('id', 'standard', 'thumbnail', 'state', 'ready', 'srcset')
         extra_kwargs = {
-            'id': {'read_only': True}
+            'id': {'read_only': True},
+            'state': {'read_only': True}
         }
 
+    @staticmethod
+    def get_ready(obj):
+        return images.renditions_ready(obj)
+
+    def get_srcset(self, obj):
+        return renditions.srcset('posts', obj, self.context.get('request'))
+
+
+class PostListSerializer(ListSerializer):
+    """Loads the comment counts of the whole page in one go."""
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_comment_counts(posts)
+        return super(PostListSerializer, self).to_representation(posts)
+
 
 class PostSerializer(ModelSerializer, ImageSerializerMixer):
     likes_count = IntegerField(read_only=True)
     vet_comments = SerializerMethodField(read_only=True)
     owner_comments = SerializerMethodField(read_only=True)
     images = ImagePostSerializer(many=True, read_only=True)
-    image_1 = ImageField(write_only=True, required=False)
-    image_2 = ImageField(write_only=True, required=False)
-    image_3 = ImageField(write_only=True, required=False)
+    image_1 = UploadImageField(write_only=True, required=False)
+    image_2 = UploadImageField(write_only=True, required=False)
+    image_3 = UploadImageField(write_only=True, required=False)
     user_detail = UserSerializers(read_only=True, source='user')
     interested = BooleanField(read_only=True)
     is_paid = BooleanField(read_only=True)
@@ -46,6 +66,7 @@ class PostSerializer(ModelSerializer, ImageSerializerMixer):
             'user': {'read_only': True},
             'id': {'read_only': True},
         }
+        list_serializer_class = PostListSerializer
 
     def create(self, validated_data):
         image_1 = validated_data.pop('image_1', None)
@@ -69,80 +90,52 @@ class PostSerializer(ModelSerializer, ImageSerializerMixer):
 
     def create_image_post(self, image_stream, post, index):
         """
-            This definition receive the image stream, make two image
-            off the same stream, then create an ImagePost instance and
-            assign it to the post passed. Then the instance is saved
+            This definition store the image stream as the original of a new
+            ImagePost of the post passed, its standard and thumbnail
+            renditions are reused or made in background.
         """
-        img = Img.open(StringIO(image_stream.read()))
-        img_copy = img.copy()
-        standard = self.image_resize(STANDARD_SIZE, img, image_stream)
-        thumbnail = self.image_resize(THUMBNAIL_SIZE, img_copy, image_stream)
         image_post = ImagePost(
-            standard=standard, thumbnail=thumbnail,
-            post=post, image_number=index)
-        image_post.save()
+            original=image_stream, post=post, image_number=index)
+        images.ingest(image_post)
         return image_post
 
     def update_image_post(self, image_stream, image_post):
         """
-        Method to update thumbnail and standard fields of an ImagePost
-        instance.
+        Method to replace the original of an ImagePost instance, the
+        previous renditions are served until the new ones are ready.
 
         :param image_stream: streaming of the image
         :param image_post: ImagePost instance
         :return: ImagePost instance updated
         """
-        img = Img.open(StringIO(image_stream.read()))
-        img_copy = img.copy()
-        image_post.standard = self.image_resize(
-            STANDARD_SIZE,
-            img,
-            image_stream
-        )
-        image_post.thumbnail = self.image_resize(
-            THUMBNAIL_SIZE,
-            img_copy,
-            image_stream
-        )
-        image_post.save()
+        image_post.original = image_stream
+        images.ingest(image_post)
         return image_post
 
     def get_first_vet_comment(self, obj):
         user = self.context['request'].user
         if user.is_authenticated and user.is_vet():
             return None
-        else:
-            if hasattr(
-                obj,
-                'vet_comments_queryset'
-            ) and obj.vet_comments_queryset:
-                first_vet_comment = obj.vet_comments_queryset[0]
-                return {
-                    'description': first_vet_comment.description,
-                    'created_at': first_vet_comment.created_at,
-                    'id': first_vet_comment.id,
-                    'label': first_vet_comment.user.get_label()
-                }
-
-        return None
+        prefetch_comment_counts([obj])
+        first_vet_comment = obj.first_comment_by_vet
+        if first_vet_comment is None:
+            return None
+        return {
+            'description': first_vet_comment.description,
+            'created_at': first_vet_comment.created_at,
+            'id': first_vet_comment.id,
+            'label': first_vet_comment.user.get_label()
+        }
 
     @staticmethod
     def get_vet_comments(obj):
-        if hasattr(
-            obj,
-            'vet_comments_queryset'
-        ) and obj.vet_comments_queryset:
-            return len(obj.vet_comments_queryset)
-        return 0
+        prefetch_comment_counts([obj])
+        return obj.vet_comments_count
 
     @staticmethod
     def get_owner_comments(obj):
-        if hasattr(
-            obj,
-            'owner_comments_queryset'
-        ) and obj.owner_comments_queryset:
-            return len(obj.owner_comments_queryset)
-        return 0
+        prefetch_comment_counts([obj])
+        return obj.owner_comments_count
 
 
 class PaymentAmountSerializer(ModelSerializer):
@@ -1,8 +1,15 @@
+from django.apps import apps
+from django.db.models import F
+
 from users.tasks import send_report
+from activities import inbox
 from activities.models import Activity
 from TapVet.messages import liking_post
+from TapVet import queue
 from TapVet.utils import send_notification_message
 
+from . import feed, page_cache, ranking
+
 
 def post_reporting_signal(sender, instance=None, created=False, **kwargs):
     if created:
@@ -11,22 +18,53 @@ def post_reporting_signal(sender, instance=None, created=False, **kwargs):
 
 def new_post_like_signal(sender, instance=None, created=False, **kwargs):
     if created:
+        apps.get_model('posts', 'Post').objects.filter(
+            pk=instance.post_id
+        ).update(likes_count=F('likes_count') + 1)
         post_owner = instance.post.user
         if post_owner.interested_notification:
             send_notification_message(post_owner.id, liking_post)
 
-        Activity.objects.update_or_create(
+        activity, _ = Activity.objects.update_or_create(
             user=instance.user,
             action=Activity.LIKE,
             post=instance.post,
             defaults={'active': True}
         )
+        inbox.deliver(activity)
+        feed.post_liked(instance.user_id, instance.post_id)
 
 
 def inactive_post_like_signal(sender, instance=None, **kwargs):
-    Activity.objects.update_or_create(
+    apps.get_model('posts', 'Post').objects.filter(
+        pk=instance.post_id,
+        likes_count__gt=0
+    ).update(likes_count=F('likes_count') - 1)
+    activity, _ = Activity.objects.update_or_create(
         user=instance.user,
         action=Activity.LIKE,
         post=instance.post,
         defaults={'active': False}
     )
+    inbox.deliver(activity)
+    feed.post_liked(instance.user_id, instance.post_id, liked=False)
+
+
+def new_post_signal(sender, instance=None, created=False, **kwargs):
+    if created and not kwargs.get('raw', False):
+        feed.new_post(instance)
+    # The feeds the post left are stale too, e.g. when it becomes paid
+    audience_list = page_cache.audiences(instance)
+    queue.defer(page_cache.invalidate, sorted(
+        set(audience_list) | set(getattr(instance, '_loaded_audiences', ()))
+    ))
+    instance._loaded_audiences = audience_list
+
+
+def image_post_saved(sender, instance=None, **kwargs):
+    queue.defer(page_cache.invalidate, page_cache.audiences(instance.post))
+
+
+def feed_variable_changed(sender, instance=None, **kwargs):
+    ranking.invalidate_weights()
+    feed.reweight(instance.is_vet)
@@ -0,0 +1,274 @@
+"""Testing the materialized feed"""
+import pytest
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+from helpers.tests_helpers import CustomTestCase
+from users import graph
+from users.models import User
+
+from .. import feed
+from .. import ranking
+from .. import recency
+from .. import models
+
+pytestmark = pytest.mark.django_db
+
+
+class TestFeedEntries(CustomTestCase):
+
+    def test_new_post_creates_own_and_follower_entries(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        follower = self.get_user(groups_id=1)
+        follower.follows.add(user.id)
+        post = mixer.blend(models.Post, user=user)
+        own = models.FeedEntry.objects.get(user=user, post=post)
+        followed = models.FeedEntry.objects.get(user=follower, post=post)
+        assert own.own and own.points == 1
+        assert followed.follows_author and followed.points == 1
+
+    def test_new_post_ignores_stale_follow_graph(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        follower = self.get_user(groups_id=1)
+        with override_settings(FOLLOW_GRAPH_TTL=60):
+            graph.local_graph.entries.clear()
+            assert graph.followers(user.id) == []
+            # Followed from another process, this one keeps the old set
+            User.follows.through.objects.create(
+                from_user_id=follower.id, to_user_id=user.id
+            )
+            post = mixer.blend(models.Post, user=user)
+            graph.local_graph.entries.clear()
+        assert models.FeedEntry.objects.get(
+            user=follower, post=post).follows_author
+
+    def test_like_and_unlike(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        liker = self.get_user(groups_id=1)
+        post = mixer.blend(models.Post, user=user)
+        like = models.UserLikesPost.objects.create(user=liker, post=post)
+        entry = models.FeedEntry.objects.get(user=liker, post=post)
+        assert entry.liked and entry.points == 1
+        like.delete()
+        assert not models.FeedEntry.objects.filter(
+            user=liker, post=post).exists()
+
+    def test_comment_adds_points(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        post = mixer.blend(models.Post, user=user)
+        mixer.blend('comments.Comment', user=user, post=post)
+        entry = models.FeedEntry.objects.get(user=user, post=post)
+        assert entry.own and entry.commented and entry.points == 2
+
+    def test_unfollow_clears_entries(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        follower = self.get_user(groups_id=1)
+        posts = [mixer.blend(models.Post, user=user) for _ in range(3)]
+        follower.follows.add(user.id)
+        assert models.FeedEntry.objects.filter(
+            user=follower, post__in=posts).count() == 3
+        follower.follows.remove(user.id)
+        assert not models.FeedEntry.objects.filter(user=follower).exists()
+
+    def test_follow_skips_posts_past_horizon(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        follower = self.get_user(groups_id=1)
+        old, new = [mixer.blend(models.Post, user=user) for _ in range(2)]
+        models.Post.objects.filter(pk=old.pk).update(recency=0)
+        follower.follows.add(user.id)
+        assert list(models.FeedEntry.objects.filter(
+            user=follower).values_list('post_id', flat=True)) == [new.id]
+
+    def test_rebuild_matches_signals(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        user.follows.add(other.id)
+        posts = [mixer.blend(models.Post, user=other) for _ in range(3)]
+        models.UserLikesPost.objects.create(user=user, post=posts[0])
+        before = sorted(models.FeedEntry.objects.filter(
+            user=user).values_list('post_id', 'points'))
+        models.FeedEntry.objects.filter(user=user).delete()
+        call_command('rebuild_feed', user.id, verbosity=0)
+        after = sorted(models.FeedEntry.objects.filter(
+            user=user).values_list('post_id', 'points'))
+        assert before == after
+
+
+class TestMaterializedFeed(CustomTestCase):
+
+    def test_same_order_as_live_query(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        posts = [mixer.blend(models.Post, user=other) for _ in range(5)]
+        mine = mixer.blend(models.Post, user=user)
+        models.UserLikesPost.objects.create(user=user, post=posts[1])
+        mixer.blend('comments.Comment', user=user, post=posts[1])
+        mixer.blend('comments.Comment', user=user, post=posts[3])
+        filters = feed.audience_filters(False)
+        expected = list(
+            feed.live_queryset(user, filters).values_list('id', flat=True)
+        )
+        served = feed.MaterializedFeed(user, filters, None).ranked_ids(10)
+        assert served == expected
+        assert served[0] == posts[1].id
+        assert mine.id in served
+
+    def test_slices_load_only_requested_posts(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        posts = [mixer.blend(models.Post, user=user) for _ in range(5)]
+        filters = feed.audience_filters(False)
+        sequence = feed.MaterializedFeed(
+            user, filters, models.Post.objects.all())
+        assert sequence.count() == 5
+        assert [post.id for post in sequence[1:3]] == [
+            posts[3].id, posts[2].id
+        ]
+
+    def test_keyset_pages_follow_ranked_order(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        posts = [mixer.blend(models.Post, user=other) for _ in range(7)]
+        models.UserLikesPost.objects.create(user=user, post=posts[2])
+        models.UserLikesPost.objects.create(user=user, post=posts[5])
+        filters = feed.audience_filters(False)
+        sequence = feed.MaterializedFeed(
+            user, filters, models.Post.objects.all())
+        served, position = [], None
+        while True:
+            page, position = sequence.keyset_page(position, 3)
+            served.extend(post.id for post in page)
+            if position is None:
+                break
+        assert served == sequence.ranked_ids(10)
+
+
+class TestWeightedRanking(CustomTestCase):
+
+    def test_default_weights_without_feed_variable(self):
+        assert ranking.get_weights(True) == ranking.DEFAULT_WEIGHTS
+
+    def test_weights_from_feed_variable(self):
+        self.load_feed_variables()
+        weights = ranking.get_weights(False)
+        assert weights.liked == 1
+        assert weights.own == 4
+        assert weights.paid == 0
+        assert ranking.get_weights(True).paid == 6
+
+    def test_no_paid_bucket_for_vets(self):
+        self.load_feed_variables()
+        vet = self.load_users_data().get_user(groups_id=3)
+        owner = self.get_user(groups_id=1)
+        audience = models.Post.objects.all()
+        assert len(list(
+            ranking.WeightedRanking(vet).buckets(audience))) == 1
+        engine = ranking.WeightedRanking(owner)
+        engine.weights = engine.weights._replace(paid=2)
+        assert len(list(engine.buckets(audience))) == 2
+
+    def test_saving_feed_variable_reweights_entries(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        post = mixer.blend(models.Post, user=user)
+        assert models.FeedEntry.objects.get(user=user, post=post).points == 1
+        self.load_feed_variables()
+        assert models.FeedEntry.objects.get(user=user, post=post).points == 4
+
+    def test_liked_posts_rank_by_weight(self):
+        self.load_feed_variables()
+        user = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        liked, followed = [
+            mixer.blend(models.Post, user=self.get_user(groups_id=1)),
+            mixer.blend(models.Post, user=other)
+        ]
+        user.follows.add(other.id)
+        models.UserLikesPost.objects.create(user=user, post=liked)
+        filters = feed.audience_filters(False)
+        served = feed.MaterializedFeed(user, filters, None).ranked_ids(10)
+        expected = list(
+            feed.live_queryset(user, filters).values_list('id', flat=True)
+        )
+        assert served == expected
+        assert served.index(followed.id) < served.index(liked.id)
+
+
+class TestRecency(CustomTestCase):
+
+    def test_decay(self):
+        assert recency.decay(0) == 1.0
+        assert recency.decay(24) == 0.5
+        assert recency.decay(24 * 30) == 0.0
+
+    def test_refresh(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        new, old = [mixer.blend(models.Post, user=user) for _ in range(2)]
+        models.Post.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=2, minutes=1)
+        )
+        recency.refresh()
+        assert models.Post.objects.get(pk=new.pk).recency == 1.0
+        assert models.Post.objects.get(pk=old.pk).recency == 0.25
+
+    def test_older_posts_rank_lower(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        recent, stale = [
+            mixer.blend(models.Post, user=other) for _ in range(2)
+        ]
+        models.Post.objects.filter(pk=stale.pk).update(
+            created_at=timezone.now() - timedelta(days=3)
+        )
+        recency.refresh()
+        filters = feed.audience_filters(False)
+        served = feed.MaterializedFeed(user, filters, None).ranked_ids(10)
+        assert served == [recent.id, stale.id]
+        assert served == list(
+            feed.live_queryset(user, filters).values_list('id', flat=True)
+        )
+
+    def test_refresh_recency_prunes_entries_past_horizon(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        recent, old = [
+            mixer.blend(models.Post, user=other) for _ in range(2)
+        ]
+        for post in (recent, old):
+            models.UserLikesPost.objects.create(user=user, post=post)
+        models.Post.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=31)
+        )
+        call_command('refresh_recency', stdout=StringIO())
+        assert list(models.FeedEntry.objects.filter(
+            user=user).values_list('post_id', flat=True)) == [recent.id]
+        filters = feed.audience_filters(False)
+        served = feed.MaterializedFeed(user, filters, None).ranked_ids(10)
+        assert served == [recent.id, old.id]
+        assert served == list(
+            feed.live_queryset(user, filters).values_list('id', flat=True)
+        )
+
+    def test_best_entries_beyond_the_page(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        other = self.get_user(groups_id=1)
+        posts = [mixer.blend(models.Post, user=other) for _ in range(8)]
+        for post in posts[::2]:
+            models.UserLikesPost.objects.create(user=user, post=post)
+        filters = feed.audience_filters(False)
+        sequence = feed.MaterializedFeed(user, filters, None)
+        expected = list(
+            feed.live_queryset(user, filters).values_list('id', flat=True)
+        )
+        assert sequence.ranked_ids(3) == expected[:3]
+        served, position = [], None
+        while True:
+            ranked = sequence.rank(2, position)
+            served.extend(post_id for post_id, _ in ranked)
+            if len(ranked) < 2:
+                break
+            position = [ranked[-1][1], ranked[-1][0]]
+        assert served == expected
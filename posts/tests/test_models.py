@@ -1,11 +1,20 @@
 """Testing models"""
 
 import pytest
+from django.utils.six import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
 from mixer.backend.django import mixer
 
 from pets.models import get_current_year
 from helpers.tests_helpers import CustomTestCase
+from users.models import User
+
+from ..management.commands.replay_traffic import percentile
+from ..management.commands.suggest_indexes import problems
+from ..models import Post
 
 pytestmark = pytest.mark.django_db
 
@@ -87,3 +96,88 @@ class TestPost(CustomTestCase):
         obj.set_paid()
         assert obj.visible_by_vet
         assert obj.visible_by_owner
+
+
+class TestCounters(CustomTestCase):
+
+    def test_likes_count_follows_likes(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        post = mixer.blend('posts.post', user=user)
+        likes = [
+            mixer.blend('posts.userlikespost', post=post, user=liker)
+            for liker in [self.get_user(groups_id=1) for _ in range(3)]
+        ]
+        post.refresh_from_db()
+        assert post.likes_count == 3
+        likes[0].delete()
+        post.refresh_from_db()
+        assert post.likes_count == 2
+
+    def test_upvoters_count_ignores_missing_upvoters(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        upvoter = self.get_user(groups_id=1)
+        post = mixer.blend('posts.post', user=user)
+        comment = mixer.blend('comments.comment', post=post, user=user)
+        comment.upvoters.add(upvoter.id)
+        comment.upvoters.remove(upvoter.id)
+        comment.upvoters.remove(upvoter.id)
+        comment.refresh_from_db()
+        assert comment.upvoters_count == 0
+
+    def test_reconcile_counters(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        post = mixer.blend('posts.post', user=user)
+        mixer.blend('posts.userlikespost', post=post, user=user)
+        comment = mixer.blend('comments.comment', post=post, user=user)
+        comment.upvoters.add(user.id)
+        post.__class__.objects.update(likes_count=7)
+        comment.__class__.objects.update(upvoters_count=0)
+        call_command('reconcile_counters', batch_size=1, verbosity=0)
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        assert post.likes_count == 1
+        assert comment.upvoters_count == 1
+
+
+class TestGenerateDataset(CustomTestCase):
+
+    def test_generate_dataset(self):
+        self.load_users_data().load_feed_variables()
+        call_command(
+            'generate_dataset', users=30, posts=40, seed=3, batch_size=7,
+            verbosity=0, stdout=StringIO()
+        )
+        users = User.objects.filter(username__startswith='dataset-')
+        assert users.count() == 30
+        assert Post.objects.filter(user__in=users).count() == 40
+        post = Post.objects.filter(user__in=users).last()
+        assert post.likes_count == post.user_likes.count()
+        assert post.images.count() == 1
+        with pytest.raises(CommandError):
+            call_command('generate_dataset', users=1, posts=1, verbosity=0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 95) == 0
+
+
+class TestSuggestIndexes(CustomTestCase):
+
+    def test_problems(self):
+        plan = [
+            {'table': 'posts_post', 'type': 'ALL', 'rows': 50000,
+             'key': None, 'Extra': 'Using where; Using filesort'},
+            {'table': 'users_group', 'type': 'ALL', 'rows': 5,
+             'key': None, 'Extra': ''},
+            {'table': 'comments_comment', 'type': 'ref', 'rows': 3000,
+             'key': 'post_id', 'Extra': 'Using index condition'},
+        ]
+        assert problems(plan, 1000) == [
+            ('posts_post', 'full table scan, filesort', 50000, None)
+        ]
+
+    def test_sqlite(self):
+        with pytest.raises(CommandError):
+            call_command('suggest_indexes', stdout=StringIO())
@@ -1,16 +1,22 @@
 """Testing views"""
+import os
 import pytest
 import tempfile
+from io import BytesIO
 
 from PIL import Image
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.test.utils import override_settings
 from rest_framework.test import force_authenticate
 from mixer.backend.django import mixer
 
 from .. import views
 from .. import models
+from .. import page_cache
 from helpers.tests_helpers import CustomTestCase
 
-from TapVet import messages
+from TapVet import images, messages, renditions
 from TapVet.images import STANDARD_SIZE, THUMBNAIL_SIZE
 
 from activities.models import Activity
@@ -59,6 +65,45 @@ class TestPostListCreateView(CustomTestCase):
         resp = views.PostListCreateView.as_view()(req)
         assert resp.status_code == 400
 
+    def test_get_request_non_authenticated_cached(self):
+        self.load_feed_variables()
+        user = self.load_users_data().get_user(groups_id=1)
+        page_cache.get_cache().clear()
+        mixer.blend('posts.post', user=user)
+        with override_settings(FEED_CACHE_TTL=60):
+            resp = views.PostListCreateView.as_view()(
+                self.factory.get('/?owner=1'))
+            assert resp.data['count'] == 1
+            models.Post.objects.update(description='Changed')
+            resp = views.PostListCreateView.as_view()(
+                self.factory.get('/?owner=1'))
+            assert resp.data['results'][0]['description'] != 'Changed'
+            mixer.blend('posts.post', user=user)
+            resp = views.PostListCreateView.as_view()(
+                self.factory.get('/?owner=1'))
+            assert resp.data['count'] == 2
+
+    def test_get_request_non_authenticated_moved_post(self):
+        self.load_feed_variables()
+        user = self.load_users_data().get_user(groups_id=1)
+        page_cache.get_cache().clear()
+        mixer.blend('posts.post', user=user)
+        with override_settings(FEED_CACHE_TTL=60):
+            resp = views.PostListCreateView.as_view()(
+                self.factory.get('/?owner=1'))
+            assert resp.data['count'] == 1
+            # Other params than the pagination ones share the page
+            resp = views.PostListCreateView.as_view()(
+                self.factory.get('/?owner=2'))
+            assert resp.data['count'] == 1
+            post = models.Post.objects.get()
+            post.visible_by_owner = False
+            post.visible_by_vet = True
+            post.save()
+            resp = views.PostListCreateView.as_view()(
+                self.factory.get('/?owner=1'))
+            assert resp.data['count'] == 0
+
     def test_get_request_authenticated_user(self):
         self.load_feed_variables()
         user = self.load_users_data().get_user(groups_id=1)
@@ -67,6 +112,30 @@ class TestPostListCreateView(CustomTestCase):
         resp = views.PostListCreateView.as_view()(req)
         assert resp.status_code == 200, 'Should return 200 OK'
 
+    def test_get_request_with_cursor(self):
+        self.load_feed_variables()
+        user = self.load_users_data().get_user(groups_id=1)
+        posts = [mixer.blend(models.Post, user=user) for _ in range(3)]
+        req = self.factory.get('/?cursor=&page_size=2')
+        force_authenticate(req, user=user)
+        resp = views.PostListCreateView.as_view()(req)
+        assert resp.status_code == 200, 'Should return 200 OK'
+        assert 'count' not in resp.data
+        assert [post['id'] for post in resp.data['results']] == [
+            posts[2].id, posts[1].id
+        ]
+        req = self.factory.get(resp.data['next'])
+        force_authenticate(req, user=user)
+        resp = views.PostListCreateView.as_view()(req)
+        assert [post['id'] for post in resp.data['results']] == [posts[0].id]
+        assert resp.data['next'] is None
+
+    def test_get_request_invalid_cursor(self):
+        self.load_feed_variables()
+        req = self.factory.get('/?owner=1&cursor=invalid')
+        resp = views.PostListCreateView.as_view()(req)
+        assert resp.status_code == 404
+
     def test_request_get_many_likes(self):
         self.load_users_data().load_feed_variables()
         users = [mixer.blend('users.user', groups_id=1) for _ in range(30)]
@@ -149,11 +218,87 @@ class TestPostListCreateView(CustomTestCase):
         )
         p = models.Post.objects.last()
         image = p.images.first()
+        assert image.state == 'ready'
+        assert image.original
         img_s = Image.open(image.standard)
         img_t = Image.open(image.thumbnail)
         assert img_s.size == STANDARD_SIZE
         assert img_t.size == THUMBNAIL_SIZE
 
+    def test_post_request_image_over_pixel_limit(self):
+        tmp_file = get_test_image()
+        user = self.load_users_data().get_user(groups_id=1)
+        data = {
+            'description': 'BLAh blah',
+            'image_1': tmp_file
+        }
+        tmp_file.seek(0)
+        req = self.factory.post('/', data=data)
+        force_authenticate(req, user=user)
+        with override_settings(IMAGE_MAX_PIXELS=1000):
+            resp = views.PostListCreateView.as_view()(req)
+        assert resp.status_code == 400, 'Should return Bad Request (400)'
+        assert messages.image_too_many_pixels in resp.data['image_1']
+
+    def test_post_request_same_image_is_stored_once(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        for _ in range(2):
+            tmp_file = get_test_image()
+            tmp_file.seek(0)
+            req = self.factory.post('/', data={
+                'description': 'BLAh blah',
+                'image_1': tmp_file
+            })
+            force_authenticate(req, user=user)
+            resp = views.PostListCreateView.as_view()(req)
+            assert resp.status_code == 201
+        first, second = models.ImagePost.objects.order_by('id')
+        assert first.original.name == second.original.name
+        assert first.standard.name == second.standard.name
+        assert second.state == 'ready'
+
+    def test_collect_images_after_delete(self):
+        tmp_file = get_test_image()
+        user = self.load_users_data().get_user(groups_id=1)
+        tmp_file.seek(0)
+        req = self.factory.post('/', data={
+            'description': 'BLAh blah',
+            'image_1': tmp_file
+        })
+        force_authenticate(req, user=user)
+        views.PostListCreateView.as_view()(req)
+        image = models.ImagePost.objects.get()
+        names = [image.original.name, image.thumbnail.name]
+        assert not set(names) & set(
+            images.collect_garbage(default_storage, 0))
+        image.delete()
+        assert set(names) <= set(images.collect_garbage(default_storage, 0))
+        assert not default_storage.exists(names[0])
+
+    def test_reused_renditions_are_kept_by_collect_images(self):
+        user = self.load_users_data().get_user(groups_id=1)
+
+        def upload():
+            tmp_file = get_test_image()
+            tmp_file.seek(0)
+            req = self.factory.post('/', data={
+                'description': 'BLAh blah',
+                'image_1': tmp_file
+            })
+            force_authenticate(req, user=user)
+            views.PostListCreateView.as_view()(req)
+            return models.ImagePost.objects.latest('id')
+        image = upload()
+        names = [image.standard.name, image.thumbnail.name]
+        image.delete()
+        for name in names:
+            os.utime(default_storage.path(name), (0, 0))
+        image = upload()
+        assert image.state == images.READY
+        assert image.standard.name == names[0]
+        assert not set(names) & set(
+            images.collect_garbage(default_storage, 60))
+
 
 class TestPaidPostView(CustomTestCase):
 
@@ -329,6 +474,28 @@ class TestPostByUserListView(CustomTestCase):
         ):
             assert x
 
+    def test_get_comment_counts(self):
+        self.load_users_data()
+        owner = self.get_user(groups_id=1)
+        vet = self.get_user(groups_id=3)
+        posts = [mixer.blend('posts.post', user=owner) for _ in range(3)]
+        first = mixer.blend('comments.comment', post=posts[0], user=vet)
+        mixer.blend('comments.comment', post=posts[0], user=vet)
+        mixer.blend('comments.comment', post=posts[0], user=owner)
+        mixer.blend('comments.comment', post=posts[1], user=owner)
+        req = self.factory.get('/')
+        force_authenticate(req, user=owner)
+        resp = views.PostByUserListView.as_view()(req, pk=owner.pk)
+        results = dict(
+            (result['id'], result) for result in resp.data['results']
+        )
+        assert results[posts[0].id]['vet_comments'] == 2
+        assert results[posts[0].id]['owner_comments'] == 1
+        assert results[posts[0].id]['first_vet_comment']['id'] == first.id
+        assert results[posts[1].id]['vet_comments'] == 0
+        assert results[posts[1].id]['owner_comments'] == 1
+        assert results[posts[2].id]['first_vet_comment'] is None
+
 
 class TestPostRetrieveUpdateView(CustomTestCase):
 
@@ -622,3 +789,67 @@ class TestPostPaidListView(CustomTestCase):
         force_authenticate(req, user=vet)
         resp = views.PostPaidListView.as_view()(req)
         assert resp.status_code == 200
+
+
+class TestRenditionView(CustomTestCase):
+    def create_image(self):
+        """Id and version of a new post image, read from its srcset."""
+        tmp_file = get_test_image()
+        user = self.load_users_data().get_user(groups_id=1)
+        tmp_file.seek(0)
+        req = self.factory.post('/', data={
+            'description': 'BLAh blah',
+            'image_1': tmp_file
+        })
+        force_authenticate(req, user=user)
+        resp = views.PostListCreateView.as_view()(req)
+        assert resp.status_code == 201
+        srcset = resp.data['images'][0]['srcset']
+        assert '?w=150 150w' in srcset
+        version = srcset.split('?')[0].rstrip('/').split('/')[-1]
+        return resp.data['images'][0]['id'], version
+
+    def test_get_width_bucket(self):
+        pk, version = self.create_image()
+        req = self.factory.get('/', {'w': 400}, HTTP_ACCEPT='image/jpeg')
+        resp = renditions.RenditionView.as_view()(
+            req, kind='posts', pk=pk, version=version)
+        assert resp.status_code == 200
+        assert resp['Content-Type'] == 'image/jpeg'
+        assert 'Accept' in resp['Vary']
+        img = Image.open(BytesIO(b''.join(resp.streaming_content)))
+        assert img.size == (480, 480)
+
+    def test_get_not_modified(self):
+        pk, version = self.create_image()
+        req = self.factory.get('/', {'w': 150})
+        resp = renditions.RenditionView.as_view()(
+            req, kind='posts', pk=pk, version=version)
+        req = self.factory.get(
+            '/', {'w': 150}, HTTP_IF_NONE_MATCH=resp['ETag']
+        )
+        resp2 = renditions.RenditionView.as_view()(
+            req, kind='posts', pk=pk, version=version)
+        assert resp2.status_code == 304
+        assert resp2['ETag'] == resp['ETag']
+
+    def test_get_wrong_version(self):
+        pk, version = self.create_image()
+        req = self.factory.get('/', {'w': 150})
+        with pytest.raises(Http404):
+            renditions.RenditionView.as_view()(
+                req, kind='posts', pk=pk, version='0' * 16)
+
+    def test_get_inactive_post(self):
+        pk, version = self.create_image()
+        models.Post.objects.filter(images=pk).update(active=False)
+        req = self.factory.get('/', {'w': 150})
+        with pytest.raises(Http404):
+            renditions.RenditionView.as_view()(
+                req, kind='posts', pk=pk, version=version)
+
+    def test_get_not_found(self):
+        req = self.factory.get('/', {'w': 150})
+        resp = renditions.RenditionView.as_view()
+        with pytest.raises(Http404):
+            resp(req, kind='posts', pk=1, version='0' * 16)
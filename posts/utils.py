@@ -1,11 +1,10 @@
 import stripe
-from django.utils import timezone
-from datetime import timedelta
 
-from django.db.models import Count, Case, When, IntegerField, Value, Prefetch
+from django.db.models import Count, Min
 
 from stripe.error import APIConnectionError, InvalidRequestError, CardError
 from helpers.stripe_helpers import stripe_errors_handler
+from TapVet import metrics
 from TapVet.settings import STRIPE_API_KEY
 from comments.models import Comment
 
@@ -15,40 +14,19 @@ stripe.api_key = STRIPE_API_KEY
 
 def paid_post_handler(user, amount):
     try:
-        stripe.Charge.create(
-            amount=amount,
-            currency='cad',
-            customer=str(user.stripe_token),
-            description='Charge for %s' % user.__str__()
-        )
+        with metrics.timed('external'):
+            stripe.Charge.create(
+                amount=amount,
+                currency='cad',
+                customer=str(user.stripe_token),
+                description='Charge for %s' % user.__str__()
+            )
     except (APIConnectionError, InvalidRequestError, CardError) as err:
         return stripe_errors_handler(err)
     else:
         return True
 
 
-# helpers to get annotate params
-tuple_helper = (
-    ('likes_count', Count('likers', distinct=True)),
-    ('one_day_recently', Case(
-        When(
-            created_at__gte=timezone.now() - timedelta(days=1),
-            then=Value(1)
-        ),
-        default=Value(0),
-        output_field=IntegerField()
-    ))
-)
-
-
-def get_annotate_params(*args):
-    return dict([
-        (key, value)
-        for key, value in tuple_helper
-        if key in args
-    ])
-
-
 def handler_images_order(queryset, image_id):
     images = [image for image in queryset if not image.id == image_id]
     images.sort(key=lambda x: x.image_number)
@@ -59,20 +37,35 @@ def handler_images_order(queryset, image_id):
     return images
 
 
-# Queries to prefetch
-vet_comments_queryset = Comment.objects.select_related(
-    'user__groups').filter(user__groups_id=3)
-owner_comments_queryset = Comment.objects.select_related(
-    'user__groups').filter(user__groups_id__in=[1, 2])
-
-# Prefetch vet and per owner comments
-prefetch_vet_comments = Prefetch(
-    'comments',
-    queryset=vet_comments_queryset,
-    to_attr='vet_comments_queryset'
-)
-prefetch_owner_comments = Prefetch(
-    'comments',
-    queryset=owner_comments_queryset,
-    to_attr='owner_comments_queryset'
-)
+def prefetch_comment_counts(posts):
+    """
+    Set on every post the number of vet and pet owner comments and the first
+    vet comment, with one grouped query and one query for the first vet
+    comments of the whole page, instead of loading every comment of every
+    post. The posts already loaded are skipped.
+    """
+    posts = [post for post in posts if not hasattr(post, 'vet_comments_count')]
+    if not posts:
+        return
+    counts = dict((post.id, [0, 0, None]) for post in posts)
+    rows = Comment.objects.filter(
+        post_id__in=list(counts)
+    ).values('post_id', 'author_audience').annotate(
+        total=Count('id'),
+        first=Min('id')
+    ).order_by()
+    for row in rows:
+        post_counts = counts[row['post_id']]
+        if row['author_audience'] == Comment.VET:
+            post_counts[0] += row['total']
+            post_counts[2] = min(post_counts[2] or row['first'], row['first'])
+        else:
+            post_counts[1] += row['total']
+    first_comments = Comment.objects.select_related('user__groups').in_bulk(
+        [first for _, _, first in counts.values() if first]
+    )
+    for post in posts:
+        vets, owners, first = counts[post.id]
+        post.vet_comments_count = vets
+        post.owner_comments_count = owners
+        post.first_comment_by_vet = first_comments.get(first)
@@ -1,9 +1,10 @@
 from operator import xor
 
+from django.conf import settings
 from django.http import Http404
 from django.db import IntegrityError
 from django.db.models import (
-    Case, When, Value, IntegerField, F, BooleanField, Q
+    Case, When, Value, IntegerField, BooleanField
 )
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -16,9 +17,11 @@ from rest_framework.generics import (
 from rest_framework import permissions, status
 from rest_framework.views import APIView
 
-from TapVet import messages
+from TapVet import images, messages
 from TapVet.permissions import IsVet
-from TapVet.pagination import StandardPagination, CardsPagination
+from TapVet.pagination import (
+    CardsPagination, FeedPagination, KeysetPagination
+)
 from TapVet.permissions import IsOwnerOrReadOnly
 from .serializers import (
     PostSerializer, PaymentAmountSerializer, ImagePostSerializer,
@@ -26,11 +29,9 @@ from .serializers import (
 )
 from activities.models import Activity
 
+from . import feed, page_cache
 from .models import Post, PaymentAmount, ImagePost, UserLikesPost, Report
-from .utils import (
-    get_annotate_params, handler_images_order,
-    prefetch_vet_comments, prefetch_owner_comments
-)
+from .utils import handler_images_order
 
 
 class PostListCreateView(ListCreateAPIView):
@@ -43,7 +44,7 @@ class PostListCreateView(ListCreateAPIView):
     """
     serializer_class = PostSerializer
     permission_classes = (permissions.AllowAny,)
-    pagination_class = StandardPagination
+    pagination_class = FeedPagination
 
     def create(self, request, *args, **kwargs):
         if request.user.is_authenticated():
@@ -69,21 +70,34 @@ class PostListCreateView(ListCreateAPIView):
 
     def get(self, request, *args, **kwargs):
         try:
-            return self.list(request, *args, **kwargs)
+            if request.user.is_authenticated():
+                return self.list(request, *args, **kwargs)
+            return self.anonymous_list(request, *args, **kwargs)
         except ValidationError as err:
             return Response(
                 {'detail': err.message},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def anonymous_list(self, request, *args, **kwargs):
+        """Same pages for every anonymous user, served from page_cache."""
+        veterinarian = bool(request.query_params.get('vet', None))
+        pet_owner = bool(request.query_params.get('owner', None))
+        if not xor(veterinarian, pet_owner):
+            raise ValidationError('Invalid query params')
+        return Response(page_cache.get_page(
+            page_cache.VET if veterinarian else page_cache.OWNER,
+            request.query_params,
+            lambda: self.list(request, *args, **kwargs).data
+        ))
+
     def get_queryset(self):
         user = self.request.user
-        annotate_params = get_annotate_params(
-            'one_day_recently',
-            'likes_count'
-        )
         if user.is_authenticated():
-            annotate_params['case_1'] = Case(
+            filters = feed.audience_filters(user.groups.id in [3, 4, 5])
+            if not settings.FEED_MATERIALIZED:
+                return self.helper(feed.live_queryset(user, filters))
+            interested = Case(
                 When(
                     pk__in=user.likes.all(),
                     then=Value(1)
@@ -91,76 +105,26 @@ class PostListCreateView(ListCreateAPIView):
                 default=Value(0),
                 output_field=IntegerField()
             )
-            annotate_params['case_2'] = Case(
-                When(
-                    pk__in=self.get_posts_ids(),
-                    then=Value(1)
-                ),
-                default=Value(0),
-                output_field=IntegerField()
-            )
-            annotate_params['case_3'] = Case(
-                When(
-                    user__in=user.follows.all(),
-                    then=Value(1)
-                ),
-                default=Value(0),
-                output_field=IntegerField()
+            return feed.MaterializedFeed(
+                user,
+                filters,
+                self.helper(Post.objects.annotate(interested=interested))
             )
-            annotate_params['case_4'] = Case(
-                When(
-                    user=user.id,
-                    then=Value(1)
-                ),
-                default=Value(0),
-                output_field=IntegerField()
-            )
-            annotate_params['points'] = F('case_1') + F('case_2') + \
-                F('case_3') + F('case_4') + F('one_day_recently')
-            annotate_params['interested'] = F('case_1')
-            group_id = user.groups.id
-            if group_id in [3, 4, 5]:
-                filters = Q(visible_by_vet=True, visible_by_owner=False)
-            else:
-                filters = Q(visible_by_owner=True)
-        else:
-            veterinarian = bool(self.request.query_params.get('vet', None))
-            pet_owner = bool(self.request.query_params.get('owner', None))
-            if xor(veterinarian, pet_owner):
-                if veterinarian:
-                    filters = Q(visible_by_vet=True, visible_by_owner=False)
-                else:
-                    filters = Q(visible_by_owner=True)
-            else:
-                raise ValidationError('Invalid query params')
-        return self.helper(annotate_params, filters, user.is_authenticated())
+        veterinarian = bool(self.request.query_params.get('vet', None))
+        pet_owner = bool(self.request.query_params.get('owner', None))
+        if not xor(veterinarian, pet_owner):
+            raise ValidationError('Invalid query params')
+        posts = Post.objects.filter(**feed.audience_filters(veterinarian))
+        return self.helper(posts).order_by('-id')
 
     @staticmethod
-    def helper(annotate_params, filters, is_authenticated):
-        posts = Post.objects.annotate(
-            **annotate_params
-        ).select_related(
+    def helper(posts):
+        return posts.select_related(
             'user__groups',
             'user__image'
         ).prefetch_related(
-            'images',
-            prefetch_vet_comments,
-            prefetch_owner_comments
-        ).filter(filters).exclude(active=False)
-        if is_authenticated:
-            posts = posts.order_by('-points', '-id')
-        else:
-            posts = posts.order_by('-id')
-        return posts
-
-    def get_posts_ids(self):
-        posts_ids = []
-        comments = self.request.user.comments.all()
-        for comment in comments:
-            post_id = comment.post_id
-            if post_id not in posts_ids:
-                posts_ids.append(post_id)
-        return posts_ids or [0]
+            'images'
+        ).exclude(active=False)
 
 
 class PostRetrieveUpdateView(RetrieveUpdateDestroyAPIView):
@@ -177,7 +141,7 @@ class PostRetrieveUpdateView(RetrieveUpdateDestroyAPIView):
     permission_classes = (IsOwnerOrReadOnly,)
 
     def get_queryset(self):
-        annotate_params = get_annotate_params('likes_count')
+        annotate_params = {}
         if self.request.user.is_authenticated():
             annotate_params['interested'] = Case(
                 When(
@@ -189,9 +153,6 @@ class PostRetrieveUpdateView(RetrieveUpdateDestroyAPIView):
             )
         queryset = Post.objects.annotate(
             **annotate_params
-        ).prefetch_related(
-            prefetch_vet_comments,
-            prefetch_owner_comments
         ).exclude(active=False)
         return queryset.all()
 
@@ -218,6 +179,7 @@ class ImageView(GenericAPIView):
                 )
             new_image = request.data.get('image', None)
             if new_image:
+                images.check_upload(new_image)
                 # Faking a post serializer instance to use create_image_post
                 # method, shouldn't be like this by the way.
                 serializer = PostSerializer(post, data={}, partial=True)
@@ -265,6 +227,7 @@ class ImageDetailView(DestroyAPIView):
         if post.user == request.user or request.user.is_staff:
             new_image = request.data.get('image', None)
             if new_image:
+                images.check_upload(new_image)
                 # Faking a post serializer instance to use update_image_post
                 # method, shouldn't be like this by the way.
                 serializer = PostSerializer(post, data={}, partial=True)
@@ -403,17 +366,13 @@ class PostByUserListView(ListAPIView):
     :accepted methods:
         GET
     """
-    pagination_class = StandardPagination
+    pagination_class = KeysetPagination
     permission_classes = (permissions.AllowAny,)
     serializer_class = PostSerializer
 
     def get_queryset(self):
-        qs = Post.objects.annotate(
-            **get_annotate_params('likes_count')
-        ).filter(user_id=self.kwargs['pk']).prefetch_related(
-            'images',
-            prefetch_vet_comments,
-            prefetch_owner_comments
+        qs = Post.objects.filter(user_id=self.kwargs['pk']).prefetch_related(
+            'images'
         ).exclude(active=False).exclude(active=False).order_by('-id')
         return qs
 
@@ -487,8 +446,6 @@ class PostPaidListView(ListAPIView):
             visible_by_vet=True, visible_by_owner=True
         ).exclude(
             comments__user_id=self.request.user.id
-        ).prefetch_related(
-            prefetch_vet_comments
         ).order_by(
             '-updated_at', '-comments'
         ).values_list('id', flat=True)
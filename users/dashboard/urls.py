@@ -3,7 +3,8 @@ from django.conf.urls import url
 
 from .views import (
     AdminAuth, AdminUsersListView, AdminUserDetailView, AdminPetView,
-    AdminUserDeactive, AdminVetVerificationView
+    AdminUserDeactive, AdminVetVerificationView, AdminTokenCacheView,
+    AdminMetricsView
 )
 
 urlpatterns = [
@@ -13,4 +14,6 @@ urlpatterns = [
     url(r'^(?P<pk>\d+)/sessions/$', AdminUserDeactive.as_view()),
     url(r'^(?P<pk>\d+)/verify/$', AdminVetVerificationView.as_view()),
     url(r'^login/$', AdminAuth.as_view()),
+    url(r'^token-cache/$', AdminTokenCacheView.as_view()),
+    url(r'^metrics/$', AdminMetricsView.as_view()),
 ]
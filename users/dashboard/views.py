@@ -1,5 +1,5 @@
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.http import Http404, HttpResponse
 
 from rest_framework import status
 from rest_framework.response import Response
@@ -14,7 +14,8 @@ from rest_framework.generics import (
 
 from django_filters.rest_framework import DjangoFilterBackend
 
-from TapVet import messages
+from TapVet import messages, metrics
+from TapVet.authentication import token_cache
 from TapVet.pagination import StandardPagination
 from users.serializers import UserLoginSerializer, VeterinarianSerializer
 from users.models import User, Veterinarian
@@ -204,3 +205,38 @@ class AdminVetVerificationView(GenericAPIView):
                 status=status.HTTP_202_ACCEPTED
             )
         raise Http404()
+
+
+class AdminTokenCacheView(APIView):
+    """
+    Service to see the hits and misses of the token cache of each tier,
+    counted by the process serving the request.
+
+    :accepted methods:
+        GET
+    """
+    allowed_methods = ('GET',)
+    permission_classes = (IsAdminUser,)
+
+    @staticmethod
+    def get(request, **kwargs):
+        return Response(token_cache.stats, status=status.HTTP_200_OK)
+
+
+class AdminMetricsView(APIView):
+    """
+    Service to scrape the request histograms of the process serving the
+    request, in the Prometheus text format.
+
+    :accepted methods:
+        GET
+    """
+    allowed_methods = ('GET',)
+    permission_classes = (IsAdminUser,)
+
+    @staticmethod
+    def get(request, **kwargs):
+        return HttpResponse(
+            metrics.prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
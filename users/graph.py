@@ -0,0 +1,198 @@
+"""
+Follow graph cache.
+
+The followees and the followers of every user are kept as sorted sets of
+ids: Redis sets when QUEUE_REDIS_URL is set, otherwise an LRU of
+array('I') per process. The user views and the feed reads test follows
+against them with literal id lists instead of `user.follows` subqueries.
+The feed store writes, which are never repaired, read the database with
+`load` instead.
+
+The sets are loaded from the database on first use and updated by the
+follows m2m signal, see users.signals. The per process copies of the other
+workers are dropped after FOLLOW_GRAPH_TTL seconds.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import BooleanField, Case, Value, When
+
+from TapVet import queue
+
+FOLLOWEES, FOLLOWERS = 'followees', 'followers'
+
+# Redis drops empty sets, every stored set also holds this id (no user has
+# it) so a loaded set is told apart from a missing one
+EMPTY = 0
+
+
+def load(kind, user_id):
+    through = apps.get_model('users', 'User').follows.through
+    if kind == FOLLOWEES:
+        rows = through.objects.filter(from_user_id=user_id).values_list(
+            'to_user_id', flat=True
+        )
+    else:
+        rows = through.objects.filter(to_user_id=user_id).values_list(
+            'from_user_id', flat=True
+        )
+    return sorted(rows)
+
+
+class LocalGraph(object):
+    """LRU of the sets used lately by this process."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, kind, user_id):
+        key = (kind, user_id)
+        with self.lock:
+            expires, ids = self.entries.pop(key, (0, None))
+            if expires > time.time():
+                self.entries[key] = (expires, ids)
+                return ids
+        ids = array('I', load(kind, user_id))
+        with self.lock:
+            self.entries[key] = (time.time() + settings.FOLLOW_GRAPH_TTL, ids)
+            while len(self.entries) > settings.FOLLOW_GRAPH_SIZE:
+                self.entries.popitem(last=False)
+        return ids
+
+    def members(self, kind, user_id, ids):
+        stored = self.get(kind, user_id)
+        found = set()
+        for pk in ids:
+            index = bisect_left(stored, pk)
+            if index < len(stored) and stored[index] == pk:
+                found.add(pk)
+        return found
+
+    def update(self, kind, user_id, ids, add):
+        # Only the sets already loaded are updated, the others load fresh
+        key = (kind, user_id)
+        with self.lock:
+            if key not in self.entries:
+                return
+            expires, stored = self.entries[key]
+            stored = set(stored)
+            if add:
+                stored.update(ids)
+            else:
+                stored.difference_update(ids)
+            self.entries[key] = (expires, array('I', sorted(stored)))
+
+    def drop(self, kind, user_id):
+        with self.lock:
+            self.entries.pop((kind, user_id), None)
+
+
+class RedisGraph(object):
+    """Sets shared by every process."""
+
+    # Same as LocalGraph.update, atomic so an expired set is not recreated
+    # with only the changed ids
+    UPDATE_SCRIPT = """
+        if redis.call('exists', KEYS[1]) == 1 then
+            return redis.call(ARGV[1], KEYS[1], unpack(ARGV, 2))
+        end
+    """
+
+    @staticmethod
+    def redis_key(kind, user_id):
+        return 'tapvet:%s:%s' % (kind, user_id)
+
+    def get(self, kind, user_id):
+        client = queue.get_redis()
+        key = self.redis_key(kind, user_id)
+        stored = client.smembers(key)
+        if stored:
+            return sorted(int(pk) for pk in stored if int(pk) != EMPTY)
+        ids = load(kind, user_id)
+        pipe = client.pipeline()
+        pipe.sadd(key, EMPTY, *ids)
+        pipe.expire(key, settings.FOLLOW_GRAPH_REDIS_TTL)
+        pipe.execute()
+        return ids
+
+    def members(self, kind, user_id, ids):
+        client = queue.get_redis()
+        key = self.redis_key(kind, user_id)
+        if not client.exists(key):
+            self.get(kind, user_id)
+        ids = list(ids)
+        pipe = client.pipeline(transaction=False)
+        for pk in ids:
+            pipe.sismember(key, pk)
+        return set(pk for pk, found in zip(ids, pipe.execute()) if found)
+
+    def update(self, kind, user_id, ids, add):
+        client = queue.get_redis()
+        client.eval(
+            self.UPDATE_SCRIPT, 1, self.redis_key(kind, user_id),
+            'sadd' if add else 'srem', *ids
+        )
+
+    def drop(self, kind, user_id):
+        queue.get_redis().delete(self.redis_key(kind, user_id))
+
+
+local_graph = LocalGraph()
+redis_graph = RedisGraph()
+
+
+def get_graph():
+    return local_graph if queue.get_redis() is None else redis_graph
+
+
+def followees(user_id):
+    return list(get_graph().get(FOLLOWEES, user_id))
+
+
+def followers(user_id):
+    return list(get_graph().get(FOLLOWERS, user_id))
+
+
+def following(user_id, ids):
+    """Ids of `ids` followed by the user, tested in one batch."""
+    ids = list(ids)
+    if not ids:
+        return set()
+    return get_graph().members(FOLLOWEES, user_id, ids)
+
+
+def changed(follower_ids, followee_ids, follows=True):
+    if not follower_ids or not followee_ids:
+        return
+    graph = get_graph()
+    for user_id in follower_ids:
+        graph.update(FOLLOWEES, user_id, followee_ids, follows)
+    for user_id in followee_ids:
+        graph.update(FOLLOWERS, user_id, follower_ids, follows)
+
+
+def cleared(user_id):
+    """
+    Drop the sets of a user whose follows were cleared, the other side of
+    the cleared follows is refreshed after its TTL.
+    """
+    graph = get_graph()
+    graph.drop(FOLLOWEES, user_id)
+    graph.drop(FOLLOWERS, user_id)
+
+
+def annotation(ids):
+    """Boolean expression of the users with an id among `ids`."""
+    if not ids:
+        return Value(False, output_field=BooleanField())
+    return Case(
+        When(pk__in=list(ids), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField()
+    )
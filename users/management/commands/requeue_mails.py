@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from users import tasks
+
+
+class Command(BaseCommand):
+    help = 'Push again the outbox mails left unsent, run it from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=600,
+            help='Seconds a mail has to be waiting before it is pushed again'
+        )
+
+    def handle(self, *args, **options):
+        count = tasks.requeue(options['older_than'])
+        self.stdout.write('Pushed %s mails again' % count)
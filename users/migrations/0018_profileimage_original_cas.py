@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-15 09:47
+from __future__ import unicode_literals
+
+import TapVet.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_profileimage_original_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profileimage',
+            name='original',
+            field=models.ImageField(blank=True, upload_to=TapVet.images.ContentAddressedPath('original')),
+        ),
+    ]
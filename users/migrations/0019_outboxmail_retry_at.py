@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2017-03-23 10:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_profileimage_original_cas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmail',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
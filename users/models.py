@@ -3,14 +3,19 @@ from uuid import uuid4
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.contrib.auth.models import AbstractBaseUser, UserManager
-from django.db.models.signals import post_save, m2m_changed
+from django.contrib.auth.models import AbstractBaseUser, UserManager, Group
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.utils import timezone
 
 from pets.models import get_current_year, get_limit_year, uploads_path
 
+from rest_framework.authtoken.models import Token
+
+from TapVet import images, reference
+
 from .signals import (
-    create_auth_token, vet_signal, follows_changed
+    create_auth_token, vet_signal, follows_changed, invalidate_user_tokens,
+    token_deleted
 )
 from .mixins import PermissionsMixin
 
@@ -33,6 +38,11 @@ class AreaInterest(models.Model):
         return u'%s - %s' % (self.id, self.name)
 
 
+# Reference data, cached until one of them is written
+reference.watch(AreaInterest)
+reference.watch(Group)
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     IS_VET = [3, 4, 5]
     IS_OWNER = [1, 2]
@@ -110,6 +120,19 @@ post_save.connect(
 m2m_changed.connect(
     follows_changed, sender=User.follows.through)
 
+# Funcs to drop the cached tokens of a user when it changes or logs out.
+post_save.connect(
+    invalidate_user_tokens,
+    sender=User,
+    dispatch_uid="users.models.user_tokens_post_save"
+)
+
+post_delete.connect(
+    token_deleted,
+    sender=Token,
+    dispatch_uid="users.models.token_post_delete"
+)
+
 
 class Breeder(models.Model):
     breeder_type = models.CharField(max_length=100)
@@ -215,8 +238,14 @@ post_save.connect(
 class ProfileImage(models.Model):
     user = models.OneToOneField(
         User, on_delete=models.CASCADE, related_name='image')
-    standard = models.ImageField(upload_to=uploads_path)
-    thumbnail = models.ImageField(upload_to=uploads_path)
+    original = models.ImageField(
+        upload_to=images.ContentAddressedPath('original'), blank=True
+    )
+    standard = models.ImageField(upload_to=uploads_path, blank=True)
+    thumbnail = models.ImageField(upload_to=uploads_path, blank=True)
+    state = models.CharField(
+        choices=images.STATE_CHOICES, max_length=10, default=images.READY
+    )
 
     class Meta:
         verbose_name = "Profile Image"
@@ -237,3 +266,38 @@ class VerificationCode(models.Model):
 
     def has_expired(self):
         return self.created_at <= timezone.now() - timezone.timedelta(days=1)
+
+
+class OutboxMail(models.Model):
+    """
+    SendGrid mail waiting to be sent by the mails queue, see users.tasks.
+    The mails sharing a `batch` key go out together in one request.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed')
+    )
+
+    body = models.TextField()
+    batch = models.CharField(max_length=50, blank=True)
+    status = models.CharField(
+        choices=STATUS_CHOICES, max_length=10, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # End of the backoff after a failed attempt, see users.tasks.send
+    retry_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        index_together = (('status', 'batch'),)
+
+    def __unicode__(self):
+        return u'Mail %s: %s' % (self.id, self.get_status_display())
@@ -1,18 +1,16 @@
-from PIL import Image as Img
-from StringIO import StringIO
-
 from django.db import IntegrityError
 from django.contrib.auth import authenticate
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 from rest_framework.serializers import (
-    ModelSerializer, ValidationError, ImageField, Serializer, EmailField,
+    ModelSerializer, ValidationError, Serializer, EmailField,
     CharField, SerializerMethodField, IntegerField, BooleanField, ChoiceField
 )
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.serializers import AuthTokenSerializer
 
-from TapVet.images import ImageSerializerMixer, STANDARD_SIZE, THUMBNAIL_SIZE
+from TapVet import images, renditions
+from TapVet.images import ImageSerializerMixer, UploadImageField
 
 from .models import (
     User, Breeder, Veterinarian, AreaInterest, ProfileImage)
@@ -80,14 +78,25 @@ class CreateUserSerializer(ModelSerializer, SettingsMixerSerializer):
 
 
 class ProfileImageSerializer(ModelSerializer):
+    ready = SerializerMethodField(read_only=True)
+    srcset = SerializerMethodField(read_only=True)
+
     class Meta:
         model = ProfileImage
-        fields = ('id', 'standard', 'thumbnail')
+        fields = ('id', 'standard', 'thumbnail', 'state', 'ready', 'srcset')
         extra_kwargs = {
             'user': {'read_only': True},
             'id': {'read_only': True},
+            'state': {'read_only': True},
         }
 
+    @staticmethod
+    def get_ready(obj):
+        return images.renditions_ready(obj)
+
+    def get_srcset(self, obj):
+        return renditions.srcset('profiles', obj, self.context.get('request'))
+
 
 class UserSerializers(ModelSerializer):
     image = ProfileImageSerializer(read_only=True)
@@ -209,7 +218,7 @@ class UserUpdateSerializer(
 ):
     breeder = BreederSerializer(required=False)
     veterinarian = VeterinarianSerializer(required=False)
-    image = ImageField(write_only=True, required=False)
+    image = UploadImageField(write_only=True, required=False)
     images = ProfileImageSerializer(read_only=True, source='image')
     follows_count = IntegerField(read_only=True)
     followed_by_count = IntegerField(read_only=True)
@@ -308,18 +317,12 @@ class UserUpdateSerializer(
 
     def create_image_profile(self, image_stream, user):
         '''
-            This definition receive the image stream, make two image
-            off the same steam, then create an ProfileImage instance and
-            assign it to the user passed. Then the instance is saved
+            This definition store the image stream as the original of a new
+            ProfileImage of the user passed, its standard and thumbnail
+            renditions are reused or made in background.
         '''
-        img = Img.open(StringIO(image_stream.read()))
-        img_copy = img.copy()
-        standard = self.image_resize(STANDARD_SIZE, img, image_stream)
-        thumbnail = self.image_resize(THUMBNAIL_SIZE, img_copy, image_stream)
-        profile_image = ProfileImage(
-            standard=standard, thumbnail=thumbnail,
-            user=user)
-        profile_image.save()
+        profile_image = ProfileImage(original=image_stream, user=user)
+        images.ingest(profile_image)
 
     @staticmethod
     def validate_veterinarian(value):
@@ -1,7 +1,11 @@
 from rest_framework.authtoken.models import Token
 
+from TapVet import queue
+from TapVet.authentication import token_cache
 from activities.models import Activity
+from posts import feed
 
+from . import graph
 from .tasks import welcome_mail, vet_verify_mail
 
 
@@ -15,6 +19,19 @@ def create_auth_token(sender, instance=None, created=False, **kwargs):
                 welcome_mail(instance, 'VET_TECH_STUDENT')
 
 
+def invalidate_user_tokens(sender, instance=None, created=False, **kwargs):
+    # The cached tokens carry a copy of the user
+    if not created:
+        for key in Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True):
+            token_cache.delete(key)
+
+
+def token_deleted(sender, instance=None, **kwargs):
+    token_cache.delete(instance.key)
+
+
 def vet_signal(sender, instance=None, created=False, **kwargs):
     if created:
         if not kwargs.get('raw', False):  # No loaddata trigger
@@ -25,6 +42,20 @@ def vet_signal(sender, instance=None, created=False, **kwargs):
 
 
 def follows_changed(instance, action=None, pk_set=None, **kwargs):
+    reverse = kwargs.get('reverse', False)
+    if action in ('post_add', 'post_remove') and pk_set:
+        followers, followees = [instance.id], list(pk_set)
+        if reverse:
+            followers, followees = followees, followers
+        queue.defer(
+            graph.changed, followers, followees, action == 'post_add'
+        )
+    elif action == 'post_clear':
+        queue.defer(graph.cleared, instance.id)
+    if action in ('post_add', 'post_remove') and pk_set and not reverse:
+        feed.follows_changed(
+            instance.id, list(pk_set), follows=action == 'post_add'
+        )
     if action == 'post_add' and pk_set:
         Activity.objects.update_or_create(
             follows_id=pk_set.pop(),
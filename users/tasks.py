@@ -1,6 +1,13 @@
+import json
+import logging
+
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
-import sendgrid
+import requests
+from requests.adapters import HTTPAdapter
 from sendgrid.helpers.mail import (
     Email,
     Mail,
@@ -8,6 +15,17 @@ from sendgrid.helpers.mail import (
     Substitution
 )
 
+from TapVet import metrics, queue
+
+logger = logging.getLogger(__name__)
+
+MAILS_QUEUE = 'mails'
+SENDGRID_URL = 'https://api.sendgrid.com/v3/mail/send'
+# Most personalizations SendGrid accepts in one request
+MAX_PERSONALIZATIONS = 1000
+
+_session = []
+
 
 def refer_a_friend_by_email(receiver_email, sender_user):
     sendgrid_api(
@@ -64,7 +82,8 @@ def send_feedback(user, message):
             personalization=obtain_personalization(
                 user, substitutions, to_mails=mails),
             template=settings.SENDGRID_FEEDBACK
-        )
+        ),
+        batch=settings.SENDGRID_FEEDBACK
     )
 
 
@@ -82,7 +101,8 @@ def send_report(user, report):
             personalization=obtain_personalization(
                 user, substitutions, to_mails=mails),
             template=settings.SENDGRID_REPORT
-        )
+        ),
+        batch=settings.SENDGRID_REPORT
     )
 
 
@@ -116,9 +136,141 @@ def obtain_mail(personalization, template):
     return mail.get()
 
 
-def sendgrid_api(mail):
-    sg = sendgrid.SendGridAPIClient(apikey=settings.SENDGRID_API_KEY)
+def sendgrid_api(mail, batch=''):
+    """
+    Store the mail in the outbox and leave the sending to the mails queue.
+    The mails of a same `batch` share the template and sender, they are
+    sent together as the personalizations of one request.
+    """
+    from .models import OutboxMail
+
+    outbox_mail = OutboxMail.objects.create(
+        body=json.dumps(mail),
+        batch=batch
+    )
+    if batch:
+        queue.push(MAILS_QUEUE, 'users.tasks.deliver_batch', [batch])
+    else:
+        queue.push(MAILS_QUEUE, 'users.tasks.deliver_mail', [outbox_mail.id])
+
+
+def get_session():
+    """HTTP session reused by every mail sent from the process."""
+    if not _session:
+        session = requests.Session()
+        session.headers.update({
+            'Authorization': 'Bearer %s' % settings.SENDGRID_API_KEY,
+            'Content-Type': 'application/json'
+        })
+        session.mount(
+            'https://', HTTPAdapter(pool_maxsize=settings.MAILS_POOL_SIZE)
+        )
+        _session.append(session)
+    return _session[0]
+
+
+def post_mail(body):
     if settings.SEND_MAILS:
-        sg.client.mail.send.post(
-            request_body=mail
+        with metrics.timed('external'):
+            response = get_session().post(
+                SENDGRID_URL,
+                data=json.dumps(body),
+                timeout=settings.MAILS_TIMEOUT
+            )
+        response.raise_for_status()
+
+
+def claim(limit=None, **filters):
+    """Lock the pending mails matching `filters` and mark them as sending."""
+    from .models import OutboxMail
+
+    mails = OutboxMail.objects.select_for_update().filter(
+        status=OutboxMail.PENDING,
+        **filters
+    ).order_by('id')
+    if limit:
+        mails = mails[:limit]
+    with transaction.atomic():
+        mails = list(mails)
+        OutboxMail.objects.filter(
+            pk__in=[mail.id for mail in mails]
+        ).update(status=OutboxMail.SENDING, attempts=F('attempts') + 1)
+    return mails
+
+
+def deliver_mail(mail_id):
+    mails = claim(pk=mail_id)
+    if mails:
+        send(mails, json.loads(mails[0].body))
+
+
+def deliver_batch(batch):
+    mails = claim(limit=MAX_PERSONALIZATIONS, batch=batch)
+    if not mails:
+        return
+    bodies = [json.loads(mail.body) for mail in mails]
+    body = dict(bodies[0], personalizations=[
+        personalization
+        for mail_body in bodies
+        for personalization in mail_body['personalizations']
+    ])
+    send(mails, body)
+
+
+def send(mails, body):
+    from .models import OutboxMail
+
+    outbox = OutboxMail.objects.filter(pk__in=[mail.id for mail in mails])
+    try:
+        post_mail(body)
+    except requests.RequestException:
+        logger.warning('Sending %s mails failed', len(mails), exc_info=True)
+        attempts = mails[0].attempts + 1
+        if attempts >= settings.MAILS_MAX_ATTEMPTS:
+            outbox.update(status=OutboxMail.FAILED)
+            return
+        retry_delay = settings.MAILS_RETRY_DELAY * 2 ** (attempts - 1)
+        outbox.update(
+            status=OutboxMail.PENDING,
+            retry_at=timezone.now() + timezone.timedelta(seconds=retry_delay)
         )
+        if mails[0].batch:
+            queue.push(
+                MAILS_QUEUE, 'users.tasks.deliver_batch', [mails[0].batch],
+                delay=retry_delay
+            )
+        else:
+            for mail in mails:
+                queue.push(
+                    MAILS_QUEUE, 'users.tasks.deliver_mail', [mail.id],
+                    delay=retry_delay
+                )
+    else:
+        outbox.update(status=OutboxMail.SENT, sent_at=timezone.now())
+
+
+def requeue(older_than):
+    """
+    Push again the mails left pending, or left sending by a worker that
+    died, for more than `older_than` seconds. The mails still waiting for
+    the retry of a failed attempt are left to it. Returns how many.
+    """
+    from .models import OutboxMail
+
+    now = timezone.now()
+    limit = now - timezone.timedelta(seconds=older_than)
+    outbox = OutboxMail.objects.filter(
+        Q(retry_at__isnull=True) | Q(retry_at__lte=now),
+        status__in=[OutboxMail.PENDING, OutboxMail.SENDING],
+        created_at__lt=limit
+    )
+    outbox.filter(status=OutboxMail.SENDING).update(
+        status=OutboxMail.PENDING
+    )
+    mails = list(outbox.values_list('id', 'batch'))
+    for batch in set(batch for _, batch in mails if batch):
+        queue.push(MAILS_QUEUE, 'users.tasks.deliver_batch', [batch])
+    for mail_id, batch in mails:
+        if not batch:
+            queue.push(MAILS_QUEUE, 'users.tasks.deliver_mail', [mail_id])
+    return len(mails)
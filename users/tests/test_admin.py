@@ -1,5 +1,6 @@
 import pytest
 
+from django.test import Client
 from rest_framework.test import force_authenticate
 from rest_framework.authtoken.models import Token
 
@@ -248,3 +249,27 @@ class TestAdminVetVerificationView(CustomTestCase):
         resp = views.AdminVetVerificationView.as_view()(req, pk=vet.pk)
         assert resp.status_code == 403, (
             '"detail": "Forbidden.  No access to non admin user"')
+
+
+class TestAdminMetricsView(CustomTestCase):
+
+    def test_get_request(self):
+        user = self.load_users_data().get_user(is_staff=True)
+        resp = Client().get('/api/v1/users/groups/')
+        assert 'db;dur=' in resp['Server-Timing']
+        assert 'serializer;dur=' in resp['Server-Timing']
+        req = self.factory.get('/')
+        force_authenticate(req, user=user)
+        resp = views.AdminMetricsView.as_view()(req)
+        assert resp.status_code == 200
+        assert (
+            'tapvet_request_duration_seconds_count{'
+            'view="users.views.GroupsListView",method="GET"}'
+        ) in resp.content.decode('utf-8')
+
+    def test_get_request_no_admin(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        req = self.factory.get('/')
+        force_authenticate(req, user=user)
+        resp = views.AdminMetricsView.as_view()(req)
+        assert resp.status_code == 403
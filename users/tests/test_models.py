@@ -1 +1,121 @@
 # testing models
+import json
+
+import pytest
+
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from TapVet.authentication import TokenAuthentication, token_cache
+
+from helpers.tests_helpers import CustomTestCase
+
+from .. import graph
+from .. import models
+from .. import tasks
+
+pytestmark = pytest.mark.django_db
+
+
+class TestOutboxMail(CustomTestCase):
+
+    def test_signup_mail_goes_through_outbox(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        mail = models.OutboxMail.objects.get()
+        assert mail.status == models.OutboxMail.SENT
+        assert mail.attempts == 1
+        assert user.email in mail.body
+
+    def test_batch_merges_personalizations(self):
+        body = {
+            'template_id': 'template',
+            'personalizations': [{'to': [{'email': 'admin@tapvet.com'}]}]
+        }
+        mails = [
+            models.OutboxMail.objects.create(
+                body=json.dumps(body), batch='template'
+            ) for _ in range(3)
+        ]
+        sent = []
+        post_mail = tasks.post_mail
+        tasks.post_mail = sent.append
+        try:
+            tasks.deliver_batch('template')
+        finally:
+            tasks.post_mail = post_mail
+        assert len(sent) == 1
+        assert len(sent[0]['personalizations']) == 3
+        assert models.OutboxMail.objects.filter(
+            pk__in=[mail.id for mail in mails],
+            status=models.OutboxMail.SENT
+        ).count() == 3
+
+    def test_requeue_leaves_mails_waiting_for_retry(self):
+        body = json.dumps({'personalizations': []})
+        waiting, stuck = [
+            models.OutboxMail.objects.create(body=body) for _ in range(2)
+        ]
+        models.OutboxMail.objects.update(
+            created_at=timezone.now() - timezone.timedelta(hours=1)
+        )
+        models.OutboxMail.objects.filter(pk=waiting.pk).update(
+            retry_at=timezone.now() + timezone.timedelta(minutes=5)
+        )
+        assert tasks.requeue(60) == 1
+        waiting.refresh_from_db()
+        stuck.refresh_from_db()
+        assert waiting.status == models.OutboxMail.PENDING
+        assert stuck.status == models.OutboxMail.SENT
+
+
+class TestTokenCache(CustomTestCase):
+
+    def test_second_lookup_is_cached(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        auth = TokenAuthentication()
+        hits = token_cache.stats['LocalTokenTier']['hits']
+        auth.authenticate_credentials(user.auth_token.key)
+        cached, _ = auth.authenticate_credentials(user.auth_token.key)
+        assert cached == user
+        assert token_cache.stats['LocalTokenTier']['hits'] == hits + 1
+
+    def test_deactivation_invalidates(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        key = user.auth_token.key
+        auth = TokenAuthentication()
+        auth.authenticate_credentials(key)
+        user.is_active = False
+        user.save()
+        with pytest.raises(AuthenticationFailed):
+            auth.authenticate_credentials(key)
+
+    def test_logout_invalidates(self):
+        user = self.load_users_data().get_user(groups_id=1)
+        key = user.auth_token.key
+        auth = TokenAuthentication()
+        auth.authenticate_credentials(key)
+        models.Token.objects.filter(user=user).delete()
+        with pytest.raises(AuthenticationFailed):
+            auth.authenticate_credentials(key)
+
+
+class TestFollowGraph(CustomTestCase):
+
+    @override_settings(FOLLOW_GRAPH_TTL=60)
+    def test_follows_update_the_loaded_sets(self):
+        self.load_users_data()
+        graph.local_graph.entries.clear()
+        user, other, third = [self.get_user(groups_id=1) for _ in range(3)]
+        user.follows.add(other)
+        assert graph.followees(user.id) == [other.id]
+        assert graph.followers(other.id) == [user.id]
+        user.follows.add(third)
+        third.followed_by.remove(user)
+        other.followed_by.add(third)
+        assert graph.followees(user.id) == [other.id]
+        assert graph.followers(other.id) == sorted([user.id, third.id])
+        assert graph.following(user.id, [other.id, third.id]) == set(
+            [other.id])
+        assert graph.followees(user.id) == list(
+            user.follows.values_list('id', flat=True))
@@ -1,7 +1,9 @@
 """Testing Views"""
 import pytest
 from PIL import Image
+from django.db import connection
 from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.test import force_authenticate
 
@@ -11,6 +13,7 @@ from pets.models import get_current_year, get_limit_year
 from helpers.tests_helpers import CustomTestCase
 
 from posts.tests.test_views import get_test_image
+from TapVet import reference
 from TapVet.images import STANDARD_SIZE, THUMBNAIL_SIZE
 
 from .. import views
@@ -728,6 +731,47 @@ class TestAreaInterestListView(CustomTestCase):
         assert resp.status_code == 405, (
             '"detail": "Method "POST" not allowed."')
 
+    def test_get_request_student(self):
+        user = self.load_users_data().get_user(groups_id=4)
+        req = self.factory.get('/')
+        force_authenticate(req, user=user)
+        resp = views.AreaInterestListView.as_view()(req)
+        assert resp.data
+        for area in resp.data:
+            assert area['name'] in views.AreaInterestListView.student_areas
+
+    def test_get_request_not_modified(self):
+        user = self.load_users_data().get_user()
+        req = self.factory.get('/')
+        force_authenticate(req, user=user)
+        resp = views.AreaInterestListView.as_view()(req)
+        req = self.factory.get('/', HTTP_IF_NONE_MATCH=resp['ETag'])
+        force_authenticate(req, user=user)
+        assert views.AreaInterestListView.as_view()(req).status_code == 304
+        mixer.blend('users.AreaInterest')
+        assert views.AreaInterestListView.as_view()(req).status_code == 200
+
+
+class TestBootstrapView(CustomTestCase):
+    factory = RequestFactory()
+
+    def test_get_request_no_auth(self):
+        self.load_users_data()
+        req = self.factory.get('/')
+        resp = reference.BootstrapView.as_view()(req)
+        assert resp.status_code == 200
+        assert set(resp.data) == set(
+            ['countries', 'states', 'groups', 'app_texts'])
+        assert 'ETag' in resp
+
+    def test_get_request(self):
+        user = self.load_users_data().get_user()
+        req = self.factory.get('/')
+        force_authenticate(req, user=user)
+        resp = reference.BootstrapView.as_view()(req)
+        assert 'pet_types' in resp.data
+        assert 'area_interests' in resp.data
+
 
 class TestUserFollowView(CustomTestCase):
 
@@ -950,6 +994,36 @@ class TestUserFollowsListView(CustomTestCase):
             assert key in resp.data['results'][0]
         assert resp.data['results'][0]['following']
 
+    def follow_vets(self, user, verified, unverified):
+        country = mixer.blend(models_c.Country)
+        state = mixer.blend(models_c.State, country=country)
+        for count, is_verified in ((verified, True), (unverified, False)):
+            for _ in range(count):
+                vet = self.get_user(groups_id=3)
+                mixer.blend(
+                    'users.Veterinarian', user=vet, veterinarian_type='3',
+                    verified=is_verified, country=country, state=state
+                )
+                user.follows.add(vet)
+
+    def get_vet_follows(self, user):
+        req = self.factory.get('/')
+        force_authenticate(req, user=user)
+        with CaptureQueriesContext(connection) as queries:
+            resp = views.UserFollowsListView.as_view()(req, pk=user.pk)
+        return resp, len(queries)
+
+    def test_get_list_vet_only_verified(self):
+        self.load_users_data()
+        user = self.get_user(groups_id=3)
+        self.follow_vets(user, 2, 2)
+        resp, few = self.get_vet_follows(user)
+        assert resp.data['count'] == 2
+        self.follow_vets(user, 6, 6)
+        resp, many = self.get_vet_follows(user)
+        assert resp.data['count'] == 8
+        assert many == few
+
 
 class TestUserFollowedListView(CustomTestCase):
 
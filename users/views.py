@@ -2,7 +2,7 @@ from operator import xor
 from push_notifications.models import APNSDevice, GCMDevice
 
 from django.db import IntegrityError
-from django.db.models import Count, Value, Case, When, BooleanField
+from django.db.models import Count
 from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import Group
@@ -22,7 +22,9 @@ from rest_framework import status
 from TapVet import messages
 from TapVet.pagination import StandardPagination
 from TapVet.permissions import IsOwnerOrReadOnly
+from TapVet.reference import ReferenceListMixin
 
+from . import graph
 from .models import User, Breeder, Veterinarian, AreaInterest, VerificationCode
 
 from .serializers import (
@@ -122,7 +124,7 @@ class UserView(ListCreateAPIView):
             )
 
 
-class GroupsListView(ListAPIView):
+class GroupsListView(ReferenceListMixin, ListAPIView):
     """
     Service to list users groups.
 
@@ -133,6 +135,7 @@ class GroupsListView(ListAPIView):
     permission_classes = (permissions.AllowAny,)
     queryset = Group.objects.exclude(name__icontains='admin')
     allowed_methods = ('GET',)
+    reference_key = 'groups'
 
 
 class BreederListCreateView(ListCreateAPIView):
@@ -193,7 +196,7 @@ class VeterinarianListCreateView(ListCreateAPIView):
         )
 
 
-class AreaInterestListView(ListAPIView):
+class AreaInterestListView(ReferenceListMixin, ListAPIView):
     '''
     List for Area of Interest.
     Required:
@@ -204,17 +207,18 @@ class AreaInterestListView(ListAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = AreaInterestSerializer
 
+    student_areas = ('Small Animal', 'Large Animal', 'Other')
+
     def get_queryset(self):
-        user = self.request.user
         queryset = AreaInterest.objects.all()
-        if user.is_vet_student():
-            queryset = self.filter_student_areas(queryset)
+        if self.request.user.is_vet_student():
+            queryset = queryset.filter(name__in=self.student_areas)
         return queryset
 
-    @staticmethod
-    def filter_student_areas(areas_interest):
-        student_areas = ['Small Animal', 'Large Animal', 'Other']
-        return [area for area in areas_interest if area.name in student_areas]
+    def get_reference_key(self):
+        if self.request.user.is_vet_student():
+            return 'area_interests:student'
+        return 'area_interests'
 
 
 class UserRetrieveUpdateView(RetrieveUpdateDestroyAPIView):
@@ -292,14 +296,10 @@ class UserRetrieveUpdateView(RetrieveUpdateDestroyAPIView):
         if self.request.user.is_authenticated():
             params = dict(
                 params,
-                followed=Case(
-                    When(
-                        pk__in=self.request.user.follows.all(),
-                        then=Value(True)
-                    ),
-                    default=Value(False),
-                    output_field=BooleanField()
-                )
+                followed=graph.annotation(graph.following(
+                    self.request.user.id,
+                    [int(self.kwargs[self.lookup_field])]
+                ))
             )
         qs = self.queryset.annotate(**params).select_related('groups')
         return qs.all()
@@ -423,23 +423,17 @@ class UserFollowsListView(ListAPIView):
     def get_queryset(self):
         user = get_object_or_404(User, pk=self.kwargs.get('pk', None))
         qs = user.follows.select_related('image', 'groups')
+        if user.is_vet():
+            # Vets only list the verified vets they follow
+            qs = qs.filter(
+                veterinarian__verified=True
+            ).select_related('veterinarian')
         request_user = self.request.user
         if request_user.is_authenticated():
-            qs = qs.annotate(
-                following=Case(
-                    When(
-                        pk__in=request_user.follows.all(),
-                        then=Value(True)
-                    ),
-                    default=Value(False),
-                    output_field=BooleanField()
-                )
-            )
-        return [
-            obj
-            for obj in qs
-            if hasattr(obj, 'veterinarian') and obj.veterinarian.verified
-        ] if user.is_vet() else qs
+            qs = qs.annotate(following=graph.annotation(graph.following(
+                request_user.id, graph.followees(user.id)
+            )))
+        return qs
 
 
 class UserFollowedListView(UserFollowsListView):
@@ -448,16 +442,9 @@ class UserFollowedListView(UserFollowsListView):
         qs = user.followed_by.select_related('image', 'groups')
         request_user = self.request.user
         if request_user.is_authenticated():
-            qs = qs.annotate(
-                following=Case(
-                    When(
-                        pk__in=request_user.follows.all(),
-                        then=Value(True)
-                    ),
-                    default=Value(False),
-                    output_field=BooleanField()
-                )
-            )
+            qs = qs.annotate(following=graph.annotation(graph.following(
+                request_user.id, graph.followers(user.id)
+            )))
         return qs
 
 